@@ -1,12 +1,13 @@
-import os
-
 from flask import Flask, flash, redirect, render_template, request
 
-import trubrics
+from trubrics.integrations.flask import TrubricsFlask
 
 app = Flask(__name__)
 app.config["SECRET_KEY"] = "Trubrics Demo Flask App"
 
+# reads TRUBRICS_EMAIL & TRUBRICS_PASSWORD from environment variables, feedback is saved after each response is sent
+trubrics = TrubricsFlask(app, project="default")
+
 
 @app.route("/", methods=["GET"])
 def feedback_form():
@@ -34,18 +35,15 @@ def submit_feedback():
         raise ValueError()
 
     if feedback_type and user_response:
-        config = trubrics.init(email=os.environ["TRUBRICS_EMAIL"], password=os.environ["TRUBRICS_PASSWORD"])
-
-        feedback = trubrics.collect(
-            component_name="default",
+        trubrics.logger.log_feedback(
+            component="default",
             model="your_model_name",
-            response={
+            user_response={
                 "type": feedback_type,
                 "score": user_response,
                 "text": "A comment / textual feedback from the user.",
             },
         )
-        trubrics.save(config, feedback)
         flash(f"{feedback_type} feedback saved to Trubrics.")
     return redirect("/")
 
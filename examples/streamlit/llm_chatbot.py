@@ -84,23 +84,35 @@ if prompt := st.chat_input("Ask your question"):
         if stream:
             message_placeholder = st.empty()
             generation = ""
-            for part in client.chat.completions.create(model=model, messages=messages, stream=True):
-                generation += part.choices[0].delta.content or ""
-                message_placeholder.markdown(generation + "▌")
+            # the prompt is logged in the background once the stream ends, with latency metrics in its metadata
+            with collector.trace_generation(
+                config_model={"model": model},
+                prompt=prompt,
+                session_id=st.session_state.session_id,
+                tags=tags,
+                user_id=email,
+            ) as trace:
+                for part in trace.stream(
+                    client.chat.completions.create(model=model, messages=messages, stream=True),
+                    text=lambda part: part.choices[0].delta.content,
+                ):
+                    generation += part.choices[0].delta.content or ""
+                    message_placeholder.markdown(generation + "▌")
             message_placeholder.markdown(generation)
+            st.session_state.prompt_ids.append(trace.prompt_id)
         else:
             response = client.chat.completions.create(model=model, messages=messages)
             generation = response.choices[0].message.content
             st.write(generation)
 
-        logged_prompt = collector.log_prompt(
-            config_model={"model": model},
-            prompt=prompt,
-            generation=generation,
-            session_id=st.session_state.session_id,
-            tags=tags,
-            user_id=email,
-        )
-        st.session_state.prompt_ids.append(logged_prompt.id)
+            logged_prompt = collector.log_prompt(
+                config_model={"model": model},
+                prompt=prompt,
+                generation=generation,
+                session_id=st.session_state.session_id,
+                tags=tags,
+                user_id=email,
+            )
+            st.session_state.prompt_ids.append(logged_prompt.id)
         messages.append({"role": "assistant", "content": generation})
         st.rerun()  # force rerun of app, to load last feedback component
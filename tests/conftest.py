@@ -0,0 +1,32 @@
+from types import SimpleNamespace
+
+import pytest
+
+from trubrics.platform.backends import FirestoreBackend
+from trubrics.platform.transport import InMemoryTransport, get_transport, set_transport
+
+FIRESTORE_API_URL = "https://firestore.googleapis.com/v1/projects/p/databases/(default)/documents/organisations/o"
+
+
+@pytest.fixture
+def transport():
+    """An in memory transport, responding to requests with its `handler`, that restores the previous transport."""
+    previous = get_transport()
+    transport = InMemoryTransport()
+    set_transport(transport)
+    yield transport
+    set_transport(previous)
+
+
+@pytest.fixture
+def firestore_backend(transport):
+    """A hosted Trubrics backend, with a signed in account, sending all requests to the in memory transport."""
+    backend = FirestoreBackend("a_key", "an@email.com", "a_password", FIRESTORE_API_URL)
+    backend.get_auth = lambda: {"idToken": "a"}  # type: ignore
+    return backend
+
+
+@pytest.fixture
+def firestore_client(firestore_backend):
+    """A fake Trubrics client, with the attributes used by background writers & debouncers."""
+    return SimpleNamespace(backend=firestore_backend)
@@ -0,0 +1,93 @@
+from datetime import datetime
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from trubrics.analytics import Table, group_by, join, scores, time_bucket  # noqa: E402
+
+PROMPTS = [
+    {"id": "p1", "config_model": {"model": "gpt-4"}, "prompt": "a", "created_on": "2023-10-23T10:00:00Z"},
+    {"id": "p2", "config_model": {"model": "gpt-3.5"}, "prompt": "b", "created_on": "2023-10-24T10:00:00Z"},
+]
+
+FEEDBACK = [
+    {
+        "model": "gpt-4",
+        "prompt_id": "p1",
+        "user_response": {"type": "thumbs", "score": "👍"},
+        "created_on": datetime(2023, 10, 23, 11),
+        "tags": ["b", "a"],
+    },
+    {
+        "model": "gpt-4",
+        "prompt_id": "p1",
+        "user_response": {"type": "thumbs", "score": "👎"},
+        "created_on": datetime(2023, 10, 24, 11),
+        "tags": [],
+    },
+    {
+        "model": "gpt-3.5",
+        "prompt_id": "p3",
+        "user_response": {"type": "thumbs", "score": "👍"},
+        "created_on": datetime(2023, 10, 30, 11),
+        "tags": ["a"],
+    },
+    {
+        "model": "gpt-3.5",
+        "prompt_id": None,
+        "user_response": {"type": "thumbs", "score": None},
+        "created_on": datetime(2023, 10, 30, 12),
+        "tags": ["a"],
+    },
+]
+
+
+@pytest.fixture
+def feedback():
+    return Table.from_records(FEEDBACK)
+
+
+def test_from_records_dictionary_encodes_strings(feedback):
+    assert list(feedback.categories["model"]) == ["gpt-3.5", "gpt-4"]
+    assert list(feedback["prompt_id"]) == ["p1", "p1", "p3", None]
+    assert list(feedback["tags"]) == ["a,b", "", "a", "a"]
+    assert feedback.columns["created_on"].dtype == np.dtype("datetime64[us]")
+
+
+def test_group_by_mean_score(feedback):
+    result = group_by(feedback.with_column("score", scores(feedback)), by="model", value="score", agg="mean")
+    assert list(result["model"]) == ["gpt-3.5", "gpt-4"]
+    assert list(result["score_mean"]) == [1.0, 0.5]
+
+
+def test_group_by_time_bucket(feedback):
+    result = group_by(feedback.with_column("week", time_bucket(feedback, freq="W")), by=["week", "model"])
+    assert [str(week) for week in result["week"]] == ["2023-10-23", "2023-10-30"]
+    assert list(result["count"]) == [2, 2]
+
+
+def test_join_feedback_to_prompts(feedback):
+    joined = join(feedback, Table.from_records(PROMPTS))
+    assert len(joined) == 2
+    assert list(joined["prompt.config_model.model"]) == ["gpt-4", "gpt-4"]
+
+
+def test_save_and_load_memory_mapped(feedback, tmp_path):
+    feedback.save(str(tmp_path))
+    loaded = Table.load(str(tmp_path))
+    assert isinstance(loaded.columns["model"], np.memmap)
+    assert list(loaded["model"]) == list(feedback["model"])
+
+
+def test_from_records_encodes_mixed_types_as_strings():
+    table = Table.from_records(
+        [
+            {"metadata": {"a": "x", "b": 3, "c": 1.5}},
+            {"metadata": {"a": 3, "b": "x", "c": 2}},
+            {"metadata": {"a": None, "b": None, "c": None}},
+        ]
+    )
+    assert list(table["metadata.a"]) == ["x", "3", None]
+    assert list(table["metadata.b"]) == ["3", "x", None]
+    assert list(table.columns["metadata.c"][:2]) == [1.5, 2.0]
@@ -0,0 +1,119 @@
+import asyncio
+import json
+
+import pytest
+
+from trubrics.integrations.asgi import TrubricsMiddleware
+from trubrics.integrations.request_logger import RequestLogger, WorkerClient
+from trubrics.platform import Trubrics
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+        self.flushed = False
+
+    def log_prompt(self, **kwargs):
+        self.calls.append(("log_prompt", kwargs))
+
+    def log_feedback(self, **kwargs):
+        self.calls.append(("log_feedback", kwargs))
+
+    def flush(self):
+        self.flushed = True
+
+
+def test_request_logger_sends_after_response():
+    client = FakeClient()
+    request_logger = RequestLogger(lambda: client)
+    prompt_id = request_logger.log_prompt(config_model={"model": "a model"}, prompt="a prompt", generation="a gen")
+    request_logger.log_feedback(
+        component="default", model="a model", user_response={"type": "thumbs", "score": "👍"}, prompt_id=prompt_id
+    )
+    assert client.calls == []
+
+    request_logger.send()
+    assert [method for method, _ in client.calls] == ["log_prompt", "log_feedback"]
+    assert all(kwargs["background"] for _, kwargs in client.calls)
+    assert client.calls[1][1]["prompt_id"] == client.calls[0][1]["prompt_id"] == prompt_id
+    assert not request_logger.pending
+
+
+def test_asgi_middleware_logs_after_response():
+    client = FakeClient()
+    sent = []
+
+    async def app(scope, receive, send):
+        scope["state"]["trubrics"].log_prompt(config_model={"model": "a model"}, prompt="a prompt", generation="a gen")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+        assert client.calls == []
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = TrubricsMiddleware(app, email="an@email.com", password="a password")
+    middleware.worker_client = WorkerClient(lambda: client)
+    asyncio.run(middleware({"type": "http"}, None, send))
+    assert len(sent) == 2
+    assert [method for method, _ in client.calls] == ["log_prompt"]
+
+
+def test_flask_extension_logs_after_response():
+    flask = pytest.importorskip("flask")
+    from trubrics.integrations.flask import TrubricsFlask
+
+    client = FakeClient()
+    app = flask.Flask(__name__)
+    trubrics_flask = TrubricsFlask(app, email="an@email.com", password="a password")
+    trubrics_flask.worker_client = WorkerClient(lambda: client)
+
+    @app.route("/")
+    def index():
+        trubrics_flask.logger.log_feedback(component="default", model="a model", user_response={"type": "thumbs"})
+        return "ok"
+
+    response = app.test_client().get("/")
+    assert client.calls == []
+    response.close()
+    assert [method for method, _ in client.calls] == ["log_feedback"]
+
+
+def test_duplicate_ids_do_not_drop_the_other_logs_of_a_batch(firestore_backend, transport):
+    written = []
+
+    def handler(method, url, data):
+        if "/projects?" in url:
+            return 200, {"documents": [{"name": "projects/default", "fields": {"archived": {"booleanValue": False}}}]}
+        writes = json.loads(data)["writes"]
+        names = [write["update"]["name"].rsplit("/", 1)[1] for write in writes]
+        written.extend(names)
+        # the prompt of a retried request has already been saved
+        return 200, {
+            "writeResults": [{} for _ in writes],
+            "status": [{"code": 6 if name == "retried" else 0} for name in names],
+        }
+
+    transport.handler = handler
+    client = Trubrics(backend=firestore_backend)
+    results = []
+    commit = firestore_backend.commit
+    firestore_backend.commit = lambda writes: results.append(commit(writes)) or results[-1]  # type: ignore
+
+    for prompt_id in ["a", "retried", "b"]:
+        request_logger = RequestLogger(lambda: client)
+        request_logger.log_prompt(
+            config_model={"model": "a model"}, prompt="a prompt", generation="a gen", prompt_id=prompt_id
+        )
+        request_logger.send()
+    client.flush()
+
+    assert sorted(written) == ["a", "b", "retried"]
+    assert results and all(res == {} for res in results)
+
+
+def test_worker_client_lock_is_reset_after_fork():
+    worker_client = WorkerClient(FakeClient)
+    worker_client._lock.acquire()
+    worker_client._after_fork_in_child()
+    assert not worker_client._lock.locked()
@@ -0,0 +1,83 @@
+import json
+import os
+import stat
+
+import pytest
+
+from trubrics.platform.auth_cache import AuthCache
+
+
+def auth_handler(method, url, data):
+    if "signInWithPassword" in url:
+        if json.loads(data)["password"] != "password":
+            return 400, {"error": {"code": 400, "message": "INVALID_PASSWORD"}}
+        return 200, {
+            "idToken": "id_token",
+            "email": "an@email.com",
+            "localId": "uid",
+            "displayName": "name",
+            "refreshToken": "refresh_token",
+            "expiresIn": "3600",
+        }
+    return 200, {"id_token": "new_id_token", "user_id": "uid", "refresh_token": "refresh_token", "expires_in": "3600"}
+
+
+@pytest.fixture
+def transport(transport):
+    transport.handler = auth_handler
+    return transport
+
+
+def test_auth_cache_shared_across_instances(tmp_path, transport):
+    path = str(tmp_path / "auth.json")
+
+    assert AuthCache(path).get_auth("key", "an@email.com", "password")["idToken"] == "id_token"
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    # a new process reads the token from the file, with no auth round-trip
+    assert AuthCache(path).get_auth("key", "an@email.com", "password")["idToken"] == "id_token"
+    assert len(transport.requests) == 1
+
+
+def test_auth_cache_refreshes_expired_token(tmp_path, transport):
+    path = str(tmp_path / "auth.json")
+    cache = AuthCache(path)
+    cache.get_auth("key", "an@email.com", "password")
+    cache.set("key", "an@email.com", expiresAt=0, firestore_api_url="a_url")
+
+    refreshed = AuthCache(path).get_auth("key", "an@email.com", "password")
+    assert refreshed["idToken"] == "new_id_token"
+    assert refreshed["displayName"] == "name"
+    assert "securetoken" in transport.requests[-1]["url"]
+    assert AuthCache(path).get("key", "an@email.com", "firestore_api_url") == "a_url"
+
+
+def test_auth_cache_checks_the_password(tmp_path, transport):
+    path = str(tmp_path / "auth.json")
+    cache = AuthCache(path)
+    cache.get_auth("key", "an@email.com", "password")
+    with open(path) as file:
+        assert "password" not in json.load(file)["key:an@email.com"].values()
+
+    # cached tokens are not returned for another password, from memory or from the file
+    assert "error" in cache.get_auth("key", "an@email.com", "wrong password")
+    assert "error" in AuthCache(path).get_auth("key", "an@email.com", "wrong password")
+    assert [json.loads(request["data"])["password"] for request in transport.requests] == [
+        "password",
+        "wrong password",
+        "wrong password",
+    ]
+    assert cache.get_auth("key", "an@email.com", "password")["idToken"] == "id_token"
+    assert len(transport.requests) == 3
+
+
+def test_auth_cache_signs_in_again_after_a_password_change(tmp_path, transport):
+    path = str(tmp_path / "auth.json")
+    AuthCache(path).get_auth("key", "an@email.com", "password")
+    transport.handler = lambda method, url, data: auth_handler(method, url, data.replace("new password", "password"))
+
+    assert AuthCache(path).get_auth("key", "an@email.com", "new password")["idToken"] == "id_token"
+    assert len(transport.requests) == 2
+    # the cache is now only valid for the new password
+    assert AuthCache(path).get_auth("key", "an@email.com", "new password")["idToken"] == "id_token"
+    assert len(transport.requests) == 2
@@ -0,0 +1,105 @@
+import pytest
+
+from trubrics.platform import Trubrics
+from trubrics.platform.backends import SQLiteBackend
+
+CONFIG_MODEL = {"model": "gpt-4"}
+USER_RESPONSE = {"type": "thumbs", "score": "👍"}
+
+
+class CountingSQLiteBackend(SQLiteBackend):
+    def __init__(self, *args, **kwargs):
+        self.calls = []
+        self.commits = []
+        super().__init__(*args, **kwargs)
+
+    def list_projects(self):
+        self.calls.append("list_projects")
+        return super().list_projects()
+
+    def list_components(self, project):
+        self.calls.append(f"list_components:{project}")
+        return super().list_components(project)
+
+    def commit(self, writes):
+        self.commits.append(writes)
+        return super().commit(writes)
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = CountingSQLiteBackend(str(tmp_path / "trubrics.db"), components=[("default", "default")])
+    yield backend
+    backend.close()
+
+
+def _add_component(backend, project, component):
+    with backend._connection() as connection:
+        connection.execute("INSERT INTO components VALUES (?, ?)", (project, component))
+
+
+def test_documents_are_routed_to_their_project(backend):
+    _add_component(backend, "other", "default")
+    trubrics = Trubrics(backend=backend)
+    trubrics.log_prompt(config_model=CONFIG_MODEL, prompt="hi", generation="hello")
+    trubrics.log_prompt(config_model=CONFIG_MODEL, prompt="hi", generation="hello", project="other")
+    trubrics.log_feedback(component="default", model="gpt-4", user_response=USER_RESPONSE, project="other")
+
+    assert len(backend.list_documents("default", "prompts")[0]) == 1
+    assert len(backend.list_documents("other", "prompts")[0]) == 1
+    assert len(backend.list_documents("other", "feedback/default/responses")[0]) == 1
+    assert backend.list_documents("default", "feedback/default/responses")[0] == []
+
+
+def test_unknown_projects_are_listed_again(backend):
+    trubrics = Trubrics(backend=backend)
+    with pytest.raises(KeyError, match="not found"):
+        trubrics.log_prompt(config_model=CONFIG_MODEL, prompt="hi", generation="hello", project="new")
+    _add_component(backend, "new", "default")
+    assert trubrics.log_prompt(config_model=CONFIG_MODEL, prompt="hi", generation="hello", project="new")
+    assert backend.calls == ["list_projects"] * 3
+
+
+def test_components_are_listed_once_per_project(backend):
+    _add_component(backend, "other", "default")
+    trubrics = Trubrics(backend=backend)
+    for project in ["default", "other", "default", "other"]:
+        trubrics.log_feedback(component="default", model="gpt-4", user_response=USER_RESPONSE, project=project)
+    assert [call for call in backend.calls if call.startswith("list_components")] == [
+        "list_components:default",
+        "list_components:other",
+    ]
+
+    with pytest.raises(ValueError, match="Component 'new' not found"):
+        trubrics.log_feedback(component="new", model="gpt-4", user_response=USER_RESPONSE)
+    # a new component is found by listing the components again
+    _add_component(backend, "default", "new")
+    assert trubrics.log_feedback(component="new", model="gpt-4", user_response=USER_RESPONSE)
+
+
+def test_flush_groups_sessions_by_project(backend):
+    _add_component(backend, "other", "default")
+    trubrics = Trubrics(backend=backend)
+    for project, session_id in [("default", "a"), ("other", "b"), ("default", "c")]:
+        trubrics.session(session_id, config_model=CONFIG_MODEL, project=project).log_turn("hi", "hello")
+    trubrics.flush()
+
+    assert [{write.project for write in writes} for writes in backend.commits] == [{"default"}, {"other"}]
+    assert [len(writes) for writes in backend.commits] == [4, 2]
+    for project, session_id in [("default", "a"), ("other", "b"), ("default", "c")]:
+        assert len(backend.list_documents(project, f"sessions/{session_id}/turns")[0]) == 1
+
+
+def test_flush_splits_commits_at_the_backend_batch_size(backend):
+    backend.batch_size = 4
+    trubrics = Trubrics(backend=backend)
+    session = trubrics.session("a", config_model=CONFIG_MODEL, batch_size=100)
+    for i in range(9):
+        session.log_turn(f"prompt {i}", "hello")
+    trubrics.session("b", config_model=CONFIG_MODEL).log_turn("hi", "hello")
+    trubrics.flush()
+
+    # 1 session & 9 turn writes, then 1 session & 1 turn write
+    assert [len(writes) for writes in backend.commits] == [4, 4, 4]
+    assert len(backend.list_documents("default", "sessions/a/turns", page_size=100)[0]) == 9
+    assert session._pending == []
@@ -0,0 +1,87 @@
+import gc
+import json
+import threading
+import weakref
+
+import pytest
+
+from tests.conftest import FIRESTORE_API_URL
+from trubrics.platform import debounce
+from trubrics.platform.debounce import FeedbackDebouncer
+from trubrics.platform.feedback import Feedback, Response
+
+RESPONSE_URL = FIRESTORE_API_URL + "/projects/default/feedback/default/responses"
+
+
+@pytest.fixture
+def debouncer(firestore_client):
+    return FeedbackDebouncer(firestore_client)
+
+
+def feedback(score, text=None, metadata={}):
+    return Feedback(
+        id="a_feedback_id",
+        component="default",
+        model="a model",
+        user_response=Response(type="thumbs", score=score, text=text),
+        metadata=metadata,
+    )
+
+
+def test_interactions_within_window_are_merged(transport, debouncer):
+    first = feedback("👍", metadata={"a": 1})
+    debouncer.submit("default", first, window=60)
+    debouncer.submit("default", feedback("👎", text="not funny", metadata={"b": 2}), window=60)
+    debouncer.flush()
+
+    assert len(transport.requests) == 1
+    request = transport.requests[0]
+    assert request["method"] == "PATCH"
+    assert request["url"].startswith(RESPONSE_URL + "/a_feedback_id?")
+    assert "updateMask.fieldPaths=user_response" in request["url"]
+    # the created time of an existing document is kept
+    assert "updateMask.fieldPaths=created_on" not in request["url"]
+    assert request["url"].endswith("&currentDocument.exists=true")
+    fields = json.loads(request["data"])["fields"]
+    assert fields["user_response"]["mapValue"]["fields"]["score"] == {"stringValue": "👎"}
+    assert set(fields["metadata"]["mapValue"]["fields"]) == {"a", "b"}
+    assert fields["created_on"] == {"timestampValue": first.created_on.isoformat() + "Z"}
+
+
+def test_feedback_is_sent_once_the_window_has_passed(transport, debouncer):
+    sent = threading.Event()
+    transport.handler = lambda method, url, data: sent.set() or (200, {})
+    debouncer.submit("default", feedback("👍"), window=0.01)
+    assert sent.wait(timeout=10)
+    assert debouncer._pending == {}
+
+
+def test_new_feedback_is_created_with_all_fields(transport, debouncer):
+    not_found = {"error": {"code": 404, "status": "NOT_FOUND", "message": "No document to update."}}
+    transport.handler = lambda method, url, data: (404, not_found) if method == "PATCH" else (200, {})
+    debouncer.submit("default", feedback("👍"), window=60)
+    debouncer.flush()
+
+    assert [request["method"] for request in transport.requests] == ["PATCH", "POST"]
+    assert transport.requests[1]["url"] == RESPONSE_URL + "?documentId=a_feedback_id"
+    assert "created_on" in json.loads(transport.requests[1]["data"])["fields"]
+
+
+def test_flush_sends_pending_feedback(transport, debouncer):
+    debouncer.submit("default", feedback("👍"), window=60)
+    debouncer.flush()
+    assert len(transport.requests) == 1
+    debouncer.flush()
+    assert len(transport.requests) == 1
+
+
+def test_debouncers_are_flushed_at_exit(transport, debouncer):
+    debouncer.submit("default", feedback("👍"), window=60)
+    debounce._flush_at_exit()
+    assert len(transport.requests) == 1
+
+
+def test_debouncers_are_not_kept_alive_for_exit(firestore_client):
+    debouncer = weakref.ref(FeedbackDebouncer(firestore_client))
+    gc.collect()
+    assert debouncer() is None
@@ -0,0 +1,185 @@
+import array
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from tests.conftest import FIRESTORE_API_URL
+from trubrics.platform import Trubrics
+from trubrics.platform.feedback import Feedback
+from trubrics.platform.firestore import (
+    build_structured_query,
+    create_document_write,
+    decode_array,
+    dict_to_firestore_document,
+    encode_array,
+    field_filter,
+    firestore_document_to_dict,
+    firestore_document_to_model,
+    firestore_documents_to_columns,
+    firestore_fields_to_dict,
+    run_aggregation_query,
+    save_document_to_collection,
+)
+
+FEEDBACK = {
+    "component": "default",
+    "model": "gpt-3.5-turbo",
+    "user_response": {"type": "thumbs", "score": "👎", "text": None},
+    "created_on": datetime(2023, 10, 24, 10, 30, 0, 123456),
+    "prompt_id": None,
+    "user_id": "a_user",
+    "tags": ["a", "b"],
+    "metadata": {"n": 3, "latency": 1.5, "flag": True, "history": [{"role": "user", "content": "hi"}]},
+}
+
+
+def _firestore_document(document_id, python_dict):
+    return {
+        "name": f"projects/p/databases/(default)/documents/a/{document_id}",
+        **dict_to_firestore_document(python_dict),
+    }
+
+
+def test_firestore_document_to_dict_round_trip():
+    decoded = firestore_document_to_dict(_firestore_document("abc", FEEDBACK))
+    assert decoded == {**FEEDBACK, "id": "abc"}
+
+
+@pytest.mark.parametrize(
+    "timestamp,expected",
+    [
+        ("2023-10-24T10:30:00Z", datetime(2023, 10, 24, 10, 30)),
+        ("2023-10-24T10:30:00.123456789Z", datetime(2023, 10, 24, 10, 30, 0, 123456)),
+    ],
+)
+def test_firestore_document_to_dict_timestamps(timestamp, expected):
+    document = {"name": "a/b", "fields": {"created_on": {"timestampValue": timestamp}}}
+    assert firestore_document_to_dict(document)["created_on"] == expected
+
+
+def test_firestore_document_to_model():
+    feedback = firestore_document_to_model(_firestore_document("abc", FEEDBACK), Feedback)
+    assert feedback.id == "abc"
+    assert feedback.user_response.score == "👎"
+
+
+def test_firestore_documents_to_columns():
+    other = {"model": "gpt-4", "user_response": {"type": "thumbs", "score": "👍"}}
+    columns = firestore_documents_to_columns([_firestore_document("a", FEEDBACK), _firestore_document("b", other)])
+    assert columns["id"] == ["a", "b"]
+    assert columns["model"] == ["gpt-3.5-turbo", "gpt-4"]
+    assert columns["user_response.score"] == ["👎", "👍"]
+    assert columns["user_id"] == ["a_user", None]
+    assert columns["tags"] == [["a", "b"], None]
+
+
+def test_firestore_documents_to_columns_selected_fields():
+    columns = firestore_documents_to_columns([_firestore_document("a", FEEDBACK)], fields=["model", "metadata"])
+    assert set(columns) == {"id", "model", "metadata"}
+    assert columns["metadata"] == [FEEDBACK["metadata"]]
+
+
+def test_build_structured_query():
+    query = build_structured_query("responses", filters=[field_filter("model", "EQUAL", "gpt-4")], limit=10)
+    assert query == {
+        "from": [{"collectionId": "responses"}],
+        "where": {"fieldFilter": {"field": {"fieldPath": "model"}, "op": "EQUAL", "value": {"stringValue": "gpt-4"}}},
+        "limit": 10,
+    }
+    filters = [field_filter("model", "EQUAL", "gpt-4"), field_filter("created_on", "LESS_THAN", datetime(2023, 1, 1))]
+    where = build_structured_query("responses", filters=filters)["where"]
+    assert where["compositeFilter"]["op"] == "AND"
+    assert where["compositeFilter"]["filters"][1]["fieldFilter"]["value"] == {"timestampValue": "2023-01-01T00:00:00Z"}
+
+
+def test_run_aggregation_query(transport):
+    result = {"aggregateFields": {"count": {"integerValue": "12"}, "avg_0": {"doubleValue": 1.5}}}
+    transport.handler = lambda method, url, data: (200, [{"result": result, "readTime": "2023-10-24T10:30:00Z"}])
+    res = run_aggregation_query(
+        {"idToken": "a"},
+        parent_url="https://a/documents/organisations/o/projects/p/feedback/default",
+        structured_query=build_structured_query("responses"),
+        aggregations=[{"alias": "count", "count": {}}, {"alias": "avg_0", "avg": {"field": {"fieldPath": "n"}}}],
+    )
+    assert res == {"count": 12, "avg_0": 1.5}
+    request = transport.requests[0]
+    assert request["url"].endswith("/feedback/default:runAggregationQuery")
+    assert len(json.loads(request["data"])["structuredAggregationQuery"]["aggregations"]) == 2
+
+
+def test_numeric_arrays_round_trip_as_bytes():
+    np = pytest.importorskip("numpy")
+    metadata = {
+        "embedding": np.linspace(0, 1, 1536, dtype=np.float32),
+        "matrix": np.arange(6, dtype=">i2").reshape(2, 3),
+        "logprobs": array.array("d", [-0.5, -1.5]),
+        "labels": np.array(["a", "b"]),
+    }
+    fields = dict_to_firestore_document({"metadata": metadata})["fields"]["metadata"]["mapValue"]["fields"]
+    assert "bytesValue" in fields["embedding"]
+    assert fields["labels"] == {"arrayValue": {"values": [{"stringValue": "a"}, {"stringValue": "b"}]}}
+
+    decoded = firestore_fields_to_dict({"metadata": {"mapValue": {"fields": fields}}})["metadata"]
+    assert decoded["embedding"].dtype == np.float32
+    np.testing.assert_array_equal(decoded["embedding"], metadata["embedding"])
+    np.testing.assert_array_equal(decoded["matrix"], metadata["matrix"])
+    np.testing.assert_array_equal(decoded["logprobs"], [-0.5, -1.5])
+    assert decoded["labels"] == ["a", "b"]
+
+
+def test_encoded_arrays_are_npy_files():
+    np = pytest.importorskip("numpy")
+    encoded = encode_array(np.arange(3, dtype=np.int64))
+    np.testing.assert_array_equal(np.load(io.BytesIO(encoded)), [0, 1, 2])
+    assert decode_array(b"not an array") == b"not an array"
+
+
+def test_save_document_with_explicit_id(transport):
+    transport.handler = lambda method, url, data: (200, {"name": "organisations/o/projects/p/prompts/a%20b&c"})
+    res = save_document_to_collection(
+        {"idToken": "a"}, FIRESTORE_API_URL, "p", "prompts", {"id": "a b&c", "prompt": "hi"}, document_id="a b&c"
+    )
+    request = transport.requests[0]
+    assert request["url"] == FIRESTORE_API_URL + "/projects/p/prompts?documentId=a%20b%26c"
+    assert json.loads(request["data"])["fields"] == {"prompt": {"stringValue": "hi"}}
+    assert "doc_id" in res
+
+
+def test_saving_an_existing_document_is_a_no_op(transport):
+    already_exists = {"error": {"code": 409, "status": "ALREADY_EXISTS", "message": "Document already exists."}}
+    transport.handler = lambda method, url, data: (409, already_exists)
+    res = save_document_to_collection({"idToken": "a"}, FIRESTORE_API_URL, "p", "prompts", {"n": 1}, document_id="a")
+    assert res == {
+        "name": "projects/p/databases/(default)/documents/organisations/o/projects/p/prompts/a",
+        "doc_id": "a",
+    }
+
+
+def test_create_document_write_has_an_exists_precondition():
+    write = create_document_write(FIRESTORE_API_URL, "p", "prompts", "a", {"n": 1})
+    assert write == {
+        "update": {
+            "name": "projects/p/databases/(default)/documents/organisations/o/projects/p/prompts/a",
+            "fields": {"n": {"integerValue": 1}},
+        },
+        "currentDocument": {"exists": False},
+    }
+
+
+def test_logging_with_the_same_ids_is_idempotent(transport, firestore_backend):
+    already_exists = {"error": {"code": 409, "status": "ALREADY_EXISTS", "message": "Document already exists."}}
+    transport.handler = lambda method, url, data: (409, already_exists)
+    firestore_backend.list_projects = lambda: ["default"]
+    firestore_backend.list_components = lambda project: ["default"]
+    trubrics = Trubrics(backend=firestore_backend)
+
+    for _ in range(2):
+        prompt = trubrics.log_prompt(config_model={"model": "gpt-4"}, prompt="hi", generation="hello", prompt_id="p1")
+        feedback = trubrics.log_feedback(
+            component="default", model="gpt-4", user_response={"type": "thumbs", "score": "👍"}, feedback_id="f1"
+        )
+        assert prompt.id == "p1"
+        assert feedback.id == "f1"
+    assert [request["url"].rsplit("=", 1)[1] for request in transport.requests] == ["p1", "f1", "p1", "f1"]
@@ -0,0 +1,52 @@
+import os
+import threading
+import time
+
+import pytest
+
+from trubrics.platform import Trubrics, forking
+from trubrics.platform.backends import SQLiteBackend
+from trubrics.platform.backends.base import DocumentWrite
+from trubrics.platform.forking import register_at_fork
+from trubrics.platform.worker import BackgroundWriter
+
+
+class FakeClient:
+    def __init__(self, backend):
+        self.backend = backend
+        self.writer = BackgroundWriter(self)
+        register_at_fork(self)
+
+    def _before_fork(self):
+        self.writer.flush()
+
+    def _after_fork_in_child(self):
+        self.writer._reset()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_pending_writes_are_flushed_before_fork(firestore_backend, transport):
+    transport.handler = lambda method, url, data: (200, {"writeResults": []})
+    client = FakeClient(firestore_backend)
+    client.writer.submit(DocumentWrite("default", "prompts", "a_document", {"n": 1}))
+    pid = os.fork()
+    if pid == 0:
+        # the child starts with no queued writes and no writer thread, and sends nothing on exit
+        os._exit(0 if client.writer._thread is None and client.writer._queue.empty() else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    assert len(transport.requests) == 1
+
+
+def test_flush_before_fork_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(forking, "FORK_FLUSH_TIMEOUT", 0.1)
+    backend = SQLiteBackend(str(tmp_path / "trubrics.db"))
+    client = Trubrics(backend=backend)
+    unblock = threading.Event()
+    client.flush = unblock.wait  # type: ignore
+
+    start = time.monotonic()
+    client._before_fork()
+    assert time.monotonic() - start < 5
+    unblock.set()
+    backend.close()
@@ -0,0 +1,113 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from tests.conftest import FIRESTORE_API_URL
+from trubrics.platform.firestore import create_document_write, merge_document_write
+from trubrics.platform.scheduler import WriteScheduler
+from trubrics.platform.transport import TransportError, get_transport
+
+THROTTLED = {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED", "message": "Quota exceeded."}}
+
+
+@pytest.fixture
+def responses(transport):
+    """Responses of the next requests, as (status_code, body) tuples or bodies, then (200, {})."""
+    responses = []
+
+    def handler(method, url, data):
+        response = responses.pop(0) if responses else {}
+        if isinstance(response, Exception):
+            raise response
+        return response if isinstance(response, tuple) else (200, response)
+
+    transport.handler = handler
+    return responses
+
+
+@pytest.fixture
+def scheduler(firestore_backend):
+    return WriteScheduler(firestore_backend, backoff=0.0)
+
+
+def _writes(n, collection="prompts"):
+    return [create_document_write(FIRESTORE_API_URL, "default", collection, str(i), {"n": i}) for i in range(n)]
+
+
+def test_successful_commits_increase_rate_and_batch_size(responses, scheduler):
+    assert scheduler.commit(_writes(10)) == {}
+    # the rate of a new collection group is capped by the 500/50/5 ramp-up
+    assert scheduler.get_rate("prompts") == 500
+    assert scheduler.batch_size == 100
+
+
+def test_throttled_commits_back_off_and_retry(responses, scheduler):
+    responses.extend([THROTTLED, THROTTLED])
+    assert scheduler.commit(_writes(10)) == {}
+    assert scheduler.get_rate("prompts") == 500 / 4 + 50
+    assert scheduler.batch_size == 50 // 4 + 50
+
+
+def test_throttled_commits_give_up_after_max_retries(responses, scheduler):
+    scheduler.max_retries = 1
+    responses.extend([THROTTLED, THROTTLED, THROTTLED])
+    assert scheduler.commit(_writes(1)) == THROTTLED
+    assert len(responses) == 1
+
+
+def test_connection_errors_and_non_json_errors_back_off_and_retry(responses, scheduler):
+    responses.extend([TransportError("Connection reset."), (503, "<html>Service Unavailable</html>")])
+    assert scheduler.commit(_writes(10)) == {}
+    assert len(get_transport().requests) == 3
+    assert scheduler.get_rate("prompts") == 500 / 4 + 50
+
+
+def test_subcollections_share_the_rate_of_their_collection_group(responses, scheduler):
+    responses.append(THROTTLED)
+    writes = [
+        create_document_write(FIRESTORE_API_URL, "default", f"sessions/{session_id}/turns", "0", {"n": 0})
+        for session_id in ["a", "b"]
+    ]
+    assert scheduler.commit(writes) == {}
+    assert list(scheduler._rates) == ["turns"]
+    assert scheduler.get_rate("turns") == 500 / 2 + 50
+
+
+def _status(*codes):
+    return {"writeResults": [{} for _ in codes], "status": [{"code": code, "message": str(code)} for code in codes]}
+
+
+def test_existing_documents_do_not_fail_other_writes(responses, scheduler):
+    # a retried create of an existing document is a no-op, and the other writes of the batch are applied
+    responses.append(_status(0, 6, 0))
+    assert scheduler.commit(_writes(3)) == {}
+    request = get_transport().requests[0]
+    assert request["url"].endswith("/documents:batchWrite")
+    assert len(json.loads(request["data"])["writes"]) == 3
+
+
+def test_only_throttled_writes_are_retried(responses, scheduler):
+    responses.extend([_status(0, 8, 3, 10, 9), _status(0, 0, 0)])
+    assert scheduler.commit(_writes(5)) == {"error": "1 writes could not be saved to Trubrics: 3"}
+    retried = json.loads(get_transport().requests[1]["data"])["writes"]
+    assert [write["update"]["name"].rsplit("/", 1)[1] for write in retried] == ["1", "3", "4"]
+
+
+def test_writes_of_the_same_document_are_split(responses, scheduler):
+    writes = _writes(2) + _writes(1)
+    assert scheduler.commit(writes) == {}
+    batches = [json.loads(request["data"])["writes"] for request in get_transport().requests]
+    assert batches == [writes[:2], writes[2:]]
+
+
+def test_merged_documents_that_do_not_exist_are_created(responses, scheduler):
+    document = {"created_on": datetime(2023, 10, 24), "n": 1}
+    writes = [merge_document_write(FIRESTORE_API_URL, "default", "feedback/default/responses", "a", document)]
+    responses.extend([_status(5), _status(0)])
+    assert scheduler.commit(writes) == {}
+
+    merge, create = [json.loads(request["data"])["writes"][0] for request in get_transport().requests]
+    assert merge["updateMask"] == {"fieldPaths": ["n"]}
+    assert merge["currentDocument"] == {"exists": True}
+    assert create == {"update": merge["update"], "currentDocument": {"exists": False}}
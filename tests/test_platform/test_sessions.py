@@ -0,0 +1,104 @@
+import pytest
+
+from trubrics.platform import Trubrics
+from trubrics.platform.backends import SQLiteBackend
+
+CONFIG_MODEL = {"model": "gpt-4"}
+
+
+@pytest.fixture
+def trubrics(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "trubrics.db"))
+    trubrics = Trubrics(backend=backend)
+    commits = []
+    commit = backend.commit
+    backend.commit = lambda writes: commits.append(writes) or commit(writes)  # type: ignore
+    trubrics.commits = commits
+    yield trubrics
+    backend.close()
+
+
+def _turns(trubrics, session_id="a_session"):
+    documents, _ = trubrics.backend.list_documents("default", f"sessions/{session_id}/turns")
+    return sorted(documents, key=lambda turn: turn["turn"])
+
+
+def test_turns_are_written_in_batches_and_in_order(trubrics):
+    with trubrics.session("a_session", config_model=CONFIG_MODEL, batch_size=2) as session:
+        for i in range(3):
+            session.log_turn(prompt=f"prompt {i}", generation=f"generation {i}")
+        assert [turn["prompt"] for turn in _turns(trubrics)] == ["prompt 0", "prompt 1"]
+
+    turns = _turns(trubrics)
+    assert [(turn["turn"], turn["prompt"]) for turn in turns] == [(0, "prompt 0"), (1, "prompt 1"), (2, "prompt 2")]
+    assert [turn["created_on"] for turn in turns] == sorted(turn["created_on"] for turn in turns)
+
+
+def test_flush_payload(trubrics):
+    session = trubrics.session("a_session", config_model=CONFIG_MODEL, user_id="a_user", tags=["a"])
+    session.log_turn(prompt="hi", generation="hello", metadata={"n": 1})
+    trubrics.flush()
+    session.log_turn(prompt="bye", generation="goodbye")
+    trubrics.flush()
+    trubrics.flush()
+
+    first, second = trubrics.commits
+    assert [(write.collection, write.upsert) for write in first] == [
+        ("sessions", False),
+        ("sessions/a_session/turns", False),
+    ]
+    assert first[0].document_id == "a_session"
+    assert first[0].document["user_id"] == "a_user"
+    assert first[0].document["tags"] == ["a"]
+    assert {key: first[1].document[key] for key in ["turn", "prompt", "generation", "metadata"]} == {
+        "turn": 0,
+        "prompt": "hi",
+        "generation": "hello",
+        "metadata": {"n": 1},
+    }
+    # the session config is only written once
+    assert [write.document["prompt"] for write in second] == ["bye"]
+
+
+def test_exit_closes_the_session(trubrics):
+    with trubrics.session("a_session", config_model=CONFIG_MODEL, metadata={"v": 1}) as session:
+        session.log_turn(prompt="hi", generation="hello")
+    assert trubrics._sessions == {}
+    created_on = trubrics.backend.list_documents("default", "sessions")[0][0]["created_on"]
+
+    # a reopened session keeps the config & created_on of the session document
+    with trubrics.session("a_session", config_model=CONFIG_MODEL, metadata={"v": 2}) as session:
+        session.log_turn(prompt="hi again", generation="hello again")
+    [document] = trubrics.backend.list_documents("default", "sessions")[0]
+    assert document["created_on"] == created_on
+    assert document["metadata"] == {"v": 1}
+    assert len(_turns(trubrics)) == 2
+
+
+def test_turns_logged_during_a_commit_are_kept(trubrics):
+    session = trubrics.session("a_session", config_model=CONFIG_MODEL)
+    session.log_turn(prompt="first", generation="a")
+    commit = trubrics.backend.commit
+
+    def commit_and_log(writes):
+        trubrics.backend.commit = commit
+        session.log_turn(prompt="second", generation="b")
+        return commit(writes)
+
+    trubrics.backend.commit = commit_and_log
+    session.flush()
+    assert [turn.prompt for turn in session._pending] == ["second"]
+    session.flush()
+    assert [turn["prompt"] for turn in _turns(trubrics)] == ["first", "second"]
+
+
+def test_failed_turns_are_retried_in_order(trubrics):
+    session = trubrics.session("a_session", config_model=CONFIG_MODEL)
+    session.log_turn(prompt="first", generation="a")
+    commit = trubrics.backend.commit
+    trubrics.backend.commit = lambda writes: {"error": "unavailable"}
+    assert not session.flush()
+    session.log_turn(prompt="second", generation="b")
+    trubrics.backend.commit = commit
+    assert session.flush()
+    assert [turn["prompt"] for turn in _turns(trubrics)] == ["first", "second"]
@@ -0,0 +1,138 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+import pytest
+
+from trubrics.platform import Trubrics
+from trubrics.platform.backends import DocumentWrite, SQLiteBackend
+
+CONFIG_MODEL = {"model": "gpt-4"}
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "trubrics.db"), components=[("default", "default"), ("other", "default")])
+    yield backend
+    backend.close()
+
+
+def test_projects_and_components(backend):
+    assert sorted(backend.list_projects()) == ["default", "other"]
+    assert backend.list_components("other") == ["default"]
+    assert backend.list_components("unknown") == []
+
+
+def test_save_document_is_idempotent(backend):
+    assert backend.save_document("default", "prompts", "a", {"id": "a", "prompt": "hi"}) == {"doc_id": "a"}
+    assert backend.save_document("default", "prompts", "a", {"id": "a", "prompt": "hello"}) == {"doc_id": "a"}
+    documents, next_page_token = backend.list_documents("default", "prompts")
+    assert documents == [{"prompt": "hi", "id": "a"}]
+    assert next_page_token is None
+
+
+def test_upsert_document_merges_fields(backend):
+    backend.upsert_document("default", "feedback/default/responses", "a", {"score": "👍", "metadata": {"a": 1}})
+    backend.upsert_document("default", "feedback/default/responses", "a", {"text": "funny", "metadata": {"b": 2}})
+    documents, _ = backend.list_documents("default", "feedback/default/responses")
+    assert documents == [{"score": "👍", "text": "funny", "metadata": {"b": 2}, "id": "a"}]
+
+
+def test_upsert_document_keeps_created_on(backend):
+    backend.upsert_document("default", "prompts", "a", {"created_on": datetime(2023, 1, 1), "n": 1})
+    backend.upsert_document("default", "prompts", "a", {"created_on": datetime(2023, 1, 2), "n": 2})
+    documents, _ = backend.list_documents("default", "prompts")
+    assert documents == [{"created_on": datetime(2023, 1, 1), "n": 2, "id": "a"}]
+
+
+def test_commit_inserts_and_merges_in_a_transaction(backend):
+    backend.save_document("default", "sessions", "s", {"n_turns": 1, "user_id": "a_user"})
+    res = backend.commit(
+        [
+            DocumentWrite("default", "sessions", "s", {"n_turns": 2}, upsert=True),
+            DocumentWrite("default", "turns", "t1", {"n": 1}),
+            DocumentWrite("default", "turns", "t2", {"n": 2}),
+            DocumentWrite("other", "turns", "t1", {"n": 3}),
+        ]
+    )
+    assert res == {}
+    assert backend.list_documents("default", "sessions")[0] == [{"n_turns": 2, "user_id": "a_user", "id": "s"}]
+    assert backend.list_documents("default", "turns", page_size=1) == ([{"n": 1, "id": "t1"}], "t1")
+    assert backend.list_documents("default", "turns", page_token="t1") == ([{"n": 2, "id": "t2"}], None)
+    assert backend.list_documents("other", "turns")[0] == [{"n": 3, "id": "t1"}]
+
+
+def test_sync_merges_unsynced_documents_in_order(backend, firestore_backend, transport):
+    transport.handler = lambda method, url, data: (200, {"writeResults": []})
+    backend.save_document("default", "prompts", "b", {"prompt": "first"})
+    backend.save_document("default", "prompts", "a", {"prompt": "second"})
+    assert backend.sync(firestore_backend) == 2
+    assert backend.sync(firestore_backend) == 0
+
+    assert len(transport.requests) == 1
+    assert transport.requests[0]["url"].endswith(":batchWrite")
+    writes = json.loads(transport.requests[0]["data"])["writes"]
+    assert [write["update"]["name"].rsplit("/", 1)[1] for write in writes] == ["b", "a"]
+    assert [write["updateMask"] for write in writes] == [{"fieldPaths": ["prompt"]}] * 2
+
+    # updated documents are synced again
+    backend.upsert_document("default", "prompts", "a", {"generation": "hi"})
+    assert backend.sync(firestore_backend) == 1
+    writes = json.loads(transport.requests[1]["data"])["writes"]
+    assert sorted(writes[0]["updateMask"]["fieldPaths"]) == ["generation", "prompt"]
+
+
+def test_sync_keeps_documents_unsynced_on_error(backend, firestore_backend, transport):
+    transport.handler = lambda method, url, data: (400, {"error": {"code": 400, "message": "Bad request."}})
+    backend.save_document("default", "prompts", "a", {"prompt": "hi"})
+    with pytest.raises(Exception, match="Bad request"):
+        backend.sync(firestore_backend)
+    transport.handler = lambda method, url, data: (200, {"writeResults": []})
+    assert backend.sync(firestore_backend) == 1
+
+
+def test_connections_are_per_thread_and_closed(backend):
+    assert backend._connection().execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    connections = [backend._connection()]
+    thread = threading.Thread(target=lambda: connections.append(backend._connection()))
+    thread.start()
+    thread.join()
+    assert connections[0] is backend._connection()
+    assert connections[1] is not connections[0]
+
+    backend.close()
+    for connection in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+    # a new connection is opened after closing
+    assert backend.list_projects()
+
+
+def test_client_logs_to_local_backend(backend):
+    trubrics = Trubrics(backend=backend)
+    prompt = trubrics.log_prompt(config_model=CONFIG_MODEL, prompt="hi", generation="hello")
+    trubrics.log_prompt(config_model=CONFIG_MODEL, prompt="hi", generation="hello", project="other", background=True)
+    trubrics.log_feedback(
+        component="default",
+        model="gpt-4",
+        user_response={"type": "thumbs", "score": "👍"},
+        prompt_id=prompt.id,
+        background=True,
+    )
+    trubrics.flush()
+
+    prompts, _ = backend.list_documents("default", "prompts")
+    assert [document["id"] for document in prompts] == [prompt.id]
+    assert len(backend.list_documents("other", "prompts")[0]) == 1
+    feedback, _ = backend.list_documents("default", "feedback/default/responses")
+    assert feedback[0]["prompt_id"] == prompt.id
+    assert feedback[0]["user_response"]["score"] == "👍"
+
+
+def test_hosted_features_name_the_local_backend(backend):
+    trubrics = Trubrics(backend=backend)
+    with pytest.raises(ValueError, match="SQLiteBackend"):
+        trubrics.aggregate_feedback("default")
+    with pytest.raises(ValueError, match="SQLiteBackend"):
+        trubrics.watch_feedback("default")
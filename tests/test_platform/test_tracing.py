@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import pytest
+
+from trubrics.platform import tracing
+from trubrics.platform.prompts import ModelConfig, Prompt
+from trubrics.platform.tracing import GenerationTrace
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(tracing.time, "perf_counter", clock)
+    return clock
+
+
+@pytest.fixture
+def trace():
+    submitted = []
+    client = SimpleNamespace(_submit=lambda project, collection, document: submitted.append((project, document)))
+    prompt = Prompt(id="a_prompt_id", config_model=ModelConfig(model="gpt-4"), prompt="hi", generation="")
+    return GenerationTrace(client, prompt=prompt, project="default"), submitted
+
+
+def _generate(clock, tokens):
+    for token in tokens:
+        clock.now += 0.5
+        yield token
+
+
+def test_trace_times_the_stream(clock, trace):
+    trace, submitted = trace
+    with trace:
+        clock.now = 1.0
+        assert list(trace.stream(_generate(clock, ["Hello", " world"]))) == ["Hello", " world"]
+        # time spent after the stream is exhausted is not part of the generation latency
+        clock.now = 10.0
+
+    [(project, prompt)] = submitted
+    assert project == "default"
+    assert prompt.id == trace.prompt_id == "a_prompt_id"
+    assert prompt.generation == "Hello world"
+    assert prompt.metadata == {
+        "time_to_first_token": 1.5,
+        "latency": 2.0,
+        "n_chunks": 2,
+        "chunks_per_second": 1.0,
+    }
+
+
+def test_trace_stream_extracts_text_of_chunks(clock, trace):
+    trace, submitted = trace
+    chunks = [{"text": "a"}, {"text": None}, {"text": "b"}]
+    with trace:
+        assert list(trace.stream(chunks, text=lambda chunk: chunk["text"])) == chunks
+    assert submitted[0][1].generation == "ab"
+    assert submitted[0][1].metadata["n_chunks"] == 3
+
+
+def test_trace_is_not_saved_if_the_stream_raises(clock, trace):
+    trace, submitted = trace
+    with pytest.raises(RuntimeError):
+        with trace:
+            for _ in trace.stream(iter([1, 2])):
+                raise RuntimeError
+    assert submitted == []
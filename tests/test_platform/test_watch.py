@@ -0,0 +1,73 @@
+import json
+from datetime import datetime
+from itertools import islice
+
+import pytest
+
+from trubrics.platform.firestore import dict_to_firestore_document
+from trubrics.platform.watch import FeedbackWatcher
+
+RESPONSES = "projects/p/databases/(default)/documents/organisations/o/projects/default/feedback/default/responses"
+
+
+def _row(document_id, second):
+    document = {"model": "gpt-4", "created_on": datetime(2023, 10, 24, 10, 0, second)}
+    return {"document": {"name": f"{RESPONSES}/{document_id}", **dict_to_firestore_document(document)}}
+
+
+@pytest.fixture
+def pages(transport):
+    """The next pages of query results, then empty pages."""
+    pages = []
+    transport.handler = lambda method, url, data: (200, pages.pop(0) if pages else [{"readTime": "x"}])
+    return pages
+
+
+def test_watcher_reads_feedback_after_cursor(pages, transport, firestore_backend, tmp_path):
+    pages.extend([[_row("a", 1), _row("b", 2)], [_row("c", 3)]])
+    cursor_path = str(tmp_path / "cursor.json")
+    watcher = FeedbackWatcher(
+        firestore_backend,
+        "default",
+        "default",
+        fields=["model"],
+        since=datetime(2023, 10, 24),
+        cursor_path=cursor_path,
+        page_size=2,
+        min_interval=0.0,
+    )
+    assert [feedback["id"] for feedback in islice(watcher, 3)] == ["a", "b", "c"]
+
+    first, second = (json.loads(request["data"])["structuredQuery"] for request in transport.requests)
+    assert transport.requests[0]["url"].endswith("/feedback/default:runQuery")
+    assert first["where"]["fieldFilter"]["value"] == {"timestampValue": "2023-10-24T00:00:00Z"}
+    assert "startAt" not in first
+    assert {field["fieldPath"] for field in first["select"]["fields"]} == {"model", "created_on"}
+    assert second["startAt"]["values"][1] == {"referenceValue": f"{RESPONSES}/b"}
+
+    # the cursor of the first page was saved, and is resumed from
+    with open(cursor_path) as f:
+        assert json.load(f) == {"created_on": "2023-10-24T10:00:02Z", "name": f"{RESPONSES}/b"}
+    assert (
+        FeedbackWatcher(firestore_backend, "default", "default", cursor_path=cursor_path).cursor["name"]
+        == f"{RESPONSES}/b"
+    )
+
+
+def test_watcher_adapts_interval(pages, firestore_backend, monkeypatch):
+    pages.extend([[{"error": {"code": 400, "status": "FAILED_PRECONDITION"}}], [], [_row("a", 1)]])
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 4:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr("trubrics.platform.watch.time.sleep", sleep)
+    watcher = FeedbackWatcher(firestore_backend, "default", "default", min_interval=1.0, max_interval=4.0)
+    seen = []
+    with pytest.raises(KeyboardInterrupt):
+        for feedback in watcher:
+            seen.append(feedback["id"])
+    assert seen == ["a"]
+    assert sleeps == [2.0, 4.0, 2.0, 4.0]
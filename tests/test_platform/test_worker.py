@@ -0,0 +1,73 @@
+import subprocess
+import sys
+import threading
+from types import SimpleNamespace
+
+from trubrics.platform.backends import DocumentWrite, SQLiteBackend
+from trubrics.platform.worker import BackgroundWriter
+
+
+class RecordingBackend:
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.commits = []
+        self.unblock = threading.Event()
+        self.unblock.set()
+
+    def commit(self, writes):
+        self.unblock.wait()
+        self.commits.append(writes)
+        return {}
+
+
+def _write(i):
+    return DocumentWrite("default", "prompts", str(i), {"n": i})
+
+
+def test_writes_queued_during_a_commit_are_grouped_in_order():
+    backend = RecordingBackend(batch_size=3)
+    writer = BackgroundWriter(SimpleNamespace(backend=backend))
+    backend.unblock.clear()
+    for i in range(7):
+        writer.submit(_write(i))
+    backend.unblock.set()
+    writer.flush()
+
+    assert [write.document_id for writes in backend.commits for write in writes] == [str(i) for i in range(7)]
+    assert all(len(writes) <= 3 for writes in backend.commits)
+    assert len(backend.commits) <= 4
+
+
+def test_writer_thread_survives_backend_errors():
+    backend = RecordingBackend()
+    writer = BackgroundWriter(SimpleNamespace(backend=backend))
+    backend.commit = lambda writes: 1 / 0  # type: ignore
+    writer.submit(_write(0))
+    writer.flush()
+    del backend.commit
+    writer.submit(_write(1))
+    writer.flush()
+    assert writer._thread.is_alive()
+    assert [writes[0].document_id for writes in backend.commits] == ["1"]
+
+
+def test_flush_without_writes_returns_immediately():
+    writer = BackgroundWriter(SimpleNamespace(backend=RecordingBackend()))
+    writer.flush()
+    assert writer._thread is None
+
+
+def test_queued_writes_are_flushed_at_exit(tmp_path):
+    path = str(tmp_path / "trubrics.db")
+    script = f"""
+from types import SimpleNamespace
+from trubrics.platform.backends import DocumentWrite, SQLiteBackend
+from trubrics.platform.worker import BackgroundWriter
+
+writer = BackgroundWriter(SimpleNamespace(backend=SQLiteBackend({path!r})))
+for i in range(100):
+    writer.submit(DocumentWrite("default", "prompts", f"{{i:03}}", {{"n": i}}))
+"""
+    subprocess.run([sys.executable, "-c", script], check=True, timeout=60)
+    documents, _ = SQLiteBackend(path).list_documents("default", "prompts", page_size=1000)
+    assert [document["n"] for document in documents] == list(range(100))
@@ -0,0 +1,3 @@
+from trubrics.analytics.table import SCORES, Table, group_by, join, scores, time_bucket
+
+__all__ = ["SCORES", "Table", "group_by", "join", "scores", "time_bucket"]
@@ -0,0 +1,320 @@
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Literal, Optional, Union
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError('Trubrics analytics requires numpy. Install it with `pip install "trubrics[analytics]"`.')
+
+from trubrics.platform.firestore import firestore_documents_to_columns
+
+# numeric values of the out-of-the-box feedback scores
+SCORES = {"👎": 0.0, "👍": 1.0, "😞": 1.0, "🙁": 2.0, "😐": 3.0, "🙂": 4.0, "😀": 5.0}
+
+
+def _flatten(record: dict, prefix: str = "") -> Iterable[tuple]:
+    for key, value in record.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", value
+
+
+def _kind(name: str, value) -> str:
+    """The kind of column of a (non None) value: "datetime", "number", "string", "tags" or "other"."""
+    if isinstance(value, datetime) or (name == "created_on" and isinstance(value, str)):
+        return "datetime"
+    if isinstance(value, (bool, int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return "tags"
+    return "other"
+
+
+def _encode_strings(values: list):
+    """Dictionary encode a list of strings into int32 codes and sorted categories, with -1 for None."""
+    index: Dict[str, int] = {}
+    codes = np.fromiter(
+        (-1 if value is None else index.setdefault(value, len(index)) for value in values),
+        dtype=np.int32,
+        count=len(values),
+    )
+    categories = np.array(list(index), dtype=object)
+    order = np.argsort(categories)
+    rank = np.empty(len(order), dtype=np.int32)
+    rank[order] = np.arange(len(order), dtype=np.int32)
+    if len(rank):
+        codes = np.where(codes >= 0, rank[np.maximum(codes, 0)], -1).astype(np.int32)
+    return codes, categories[order]
+
+
+class Table:
+    def __init__(self, columns: Dict[str, "np.ndarray"], categories: Optional[Dict[str, "np.ndarray"]] = None):
+        """
+        A columnar table of numpy arrays. String columns are dictionary encoded: the column holds int32 codes (-1 for
+        missing values) into a sorted array of `categories`.
+
+        Args:
+            columns: a dict of equal length numpy arrays
+            categories: the categories of dictionary encoded columns
+        """
+        self.columns = columns
+        self.categories = categories or {}
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __getitem__(self, name: str) -> "np.ndarray":
+        """Get the decoded values of a column. String columns are decoded to an object array, with None if missing."""
+        values = self.columns[name]
+        if name not in self.categories:
+            return values
+        decoded = self.categories[name][np.maximum(values, 0)]
+        decoded[values < 0] = None
+        return decoded
+
+    def __repr__(self) -> str:
+        return f"Table({len(self)} rows, columns={list(self.columns)})"
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, list]) -> "Table":
+        """
+        Build a table from python lists of values, such as the output of `firestore_documents_to_columns`.
+
+        Strings are dictionary encoded, numbers & booleans are saved as float64 (NaN if missing), datetimes and the
+        "created_on" field as datetime64[us], and lists of strings (such as tags) as a dictionary encoded
+        comma separated string. Columns mixing scalars of different types are dictionary encoded as strings (with
+        `str(value)`). Other columns are dropped.
+        """
+        arrays: Dict[str, np.ndarray] = {}
+        categories: Dict[str, np.ndarray] = {}
+        for name, values in columns.items():
+            kinds = {_kind(name, value) for value in values if value is not None}
+            kind = next(iter(kinds)) if len(kinds) == 1 else "mixed" if kinds else "string"
+            if kind == "datetime":
+                arrays[name] = np.array(
+                    ["NaT" if value is None else str(value).rstrip("Z").replace("+00:00", "") for value in values],
+                    dtype="datetime64[us]",
+                )
+            elif kind == "number":
+                arrays[name] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+            elif kind == "string":
+                arrays[name], categories[name] = _encode_strings(values)
+            elif kind == "tags":
+                joined = [None if value is None else ",".join(sorted(value)) for value in values]
+                arrays[name], categories[name] = _encode_strings(joined)
+            elif kinds.isdisjoint(("tags", "other")):
+                # scalars of mixed types, e.g. metadata values that are sometimes numbers and sometimes strings
+                arrays[name], categories[name] = _encode_strings(
+                    [None if value is None else str(value) for value in values]
+                )
+        return cls(arrays, categories)
+
+    @classmethod
+    def from_records(cls, records: List[dict]) -> "Table":
+        """
+        Build a table from a list of dicts, such as a json export of prompts or feedback, or `Prompt` / `Feedback`
+        dicts. Nested dicts are flattened to dotted column names (e.g. "user_response.score").
+        """
+        columns: Dict[str, list] = {}
+        for row, record in enumerate(records):
+            for name, value in _flatten(record):
+                if name not in columns:
+                    columns[name] = [None] * len(records)
+                columns[name][row] = value
+        return cls.from_columns(columns)
+
+    @classmethod
+    def from_documents(cls, documents: List[dict]) -> "Table":
+        """Build a table from a list of Firestore REST documents, without decoding each document to a dict."""
+        return cls.from_columns(firestore_documents_to_columns(documents))
+
+    @classmethod
+    def read_json(cls, path: str) -> "Table":
+        """Build a table from a json export of prompts or feedback."""
+        with open(path) as file:
+            return cls.from_records(json.load(file))
+
+    def take(self, indices: "np.ndarray") -> "Table":
+        """Select rows by index or by boolean mask."""
+        return Table({name: values[indices] for name, values in self.columns.items()}, dict(self.categories))
+
+    def with_column(self, name: str, values: "np.ndarray") -> "Table":
+        """Return a new table with an added (or replaced) column."""
+        categories = {key: value for key, value in self.categories.items() if key != name}
+        return Table({**self.columns, name: values}, categories)
+
+    def save(self, path: str):
+        """Save the table to a directory, with a .npy file per column that may be loaded with memory mapping."""
+        os.makedirs(path, exist_ok=True)
+        for name, values in self.columns.items():
+            np.save(os.path.join(path, f"{name}.npy"), values)
+        for name, values in self.categories.items():
+            with open(os.path.join(path, f"{name}.categories.json"), "w") as file:
+                json.dump(values.tolist(), file)
+        with open(os.path.join(path, "table.json"), "w") as file:
+            json.dump({"columns": list(self.columns), "categories": list(self.categories)}, file)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "Table":
+        """
+        Load a table saved with `Table.save`.
+
+        Args:
+            path: the directory of the saved table
+            mmap: whether to memory map columns, rather than reading them into memory. Memory mapped tables may be
+                larger than the available memory.
+        """
+        with open(os.path.join(path, "table.json")) as file:
+            meta = json.load(file)
+        mmap_mode: Optional[Literal["r"]] = "r" if mmap else None
+        columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in meta["columns"]}
+        categories = {}
+        for name in meta["categories"]:
+            with open(os.path.join(path, f"{name}.categories.json")) as file:
+                categories[name] = np.array(json.load(file), dtype=object)
+        return cls(columns, categories)
+
+
+def _group_ids(table: Table, by: List[str]):
+    """Combine the key columns into a single group id per row, returning the ids and the unique keys per group."""
+    key_codes = []
+    key_values = []
+    for name in by:
+        uniques, codes = np.unique(table.columns[name], return_inverse=True)
+        key_codes.append(codes.ravel())
+        key_values.append(uniques)
+    combined, group_ids = np.unique(np.stack(key_codes), axis=1, return_inverse=True)
+    return group_ids.ravel(), [values[codes] for values, codes in zip(key_values, combined)]
+
+
+def group_by(
+    table: Table, by: Union[str, List[str]], value: Optional[str] = None, agg: str = "count"
+) -> Dict[str, "np.ndarray"]:
+    """
+    Aggregate a column per group of rows, for example the mean score per model:
+
+    ```python
+    group_by(feedback.with_column("score", scores(feedback)), by="model", value="score", agg="mean")
+    ```
+
+    Args:
+        table: the table to aggregate
+        by: the column(s) to group by
+        value: the numeric column to aggregate, not required for "count"
+        agg: the aggregation, one of ["count", "sum", "mean", "min", "max"]
+
+    Returns:
+        a dict of arrays, with the decoded group keys & the aggregation, that may be passed to `pandas.DataFrame`
+    """
+    by = [by] if isinstance(by, str) else by
+    group_ids, keys = _group_ids(table, by)
+    n_groups = len(keys[0])
+    result: np.ndarray
+    if agg == "count":
+        result = np.bincount(group_ids, minlength=n_groups)
+    else:
+        if value is None:
+            raise ValueError(f"A value column is required for agg='{agg}'.")
+        values = np.asarray(table.columns[value], dtype=np.float64)
+        valid = ~np.isnan(values)
+        if agg in ("sum", "mean"):
+            result = np.bincount(group_ids[valid], weights=values[valid], minlength=n_groups)
+            if agg == "mean":
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    result = result / np.bincount(group_ids[valid], minlength=n_groups)
+        elif agg in ("min", "max"):
+            ufunc = np.minimum if agg == "min" else np.maximum
+            result = np.full(n_groups, np.inf if agg == "min" else -np.inf)
+            ufunc.at(result, group_ids[valid], values[valid])
+            result[np.isinf(result)] = np.nan
+        else:
+            raise ValueError("agg must be one of ['count', 'sum', 'mean', 'min', 'max'].")
+    output = {}
+    for name, key in zip(by, keys):
+        if name in table.categories:
+            decoded = table.categories[name][np.maximum(key, 0)]
+            decoded[key < 0] = None
+            key = decoded
+        output[name] = key
+    output[agg if value is None else f"{value}_{agg}"] = result
+    return output
+
+
+def join(feedback: Table, prompts: Table, on: str = "prompt_id", prompt_key: str = "id") -> Table:
+    """
+    Inner join feedback to the prompts they were given on. Prompt columns are prefixed with "prompt.".
+
+    Args:
+        feedback: a table of feedback
+        prompts: a table of prompts
+        on: the feedback column holding prompt ids
+        prompt_key: the prompt id column
+    """
+    # map feedback prompt id categories to prompt id categories, then prompt id codes to prompt rows
+    prompt_categories = prompts.categories[prompt_key]
+    feedback_categories = feedback.categories[on]
+    positions = np.searchsorted(prompt_categories, feedback_categories)
+    positions = np.minimum(positions, max(len(prompt_categories) - 1, 0))
+    found = prompt_categories[positions] == feedback_categories if len(prompt_categories) else positions < 0
+    category_map = np.where(found, positions, -1)
+
+    prompt_codes = prompts.columns[prompt_key]
+    row_of_code = np.full(len(prompt_categories), -1, dtype=np.int64)
+    valid_prompts = prompt_codes >= 0
+    row_of_code[prompt_codes[valid_prompts]] = np.flatnonzero(valid_prompts)
+
+    feedback_codes = feedback.columns[on]
+    prompt_category_codes = np.where(feedback_codes >= 0, category_map[np.maximum(feedback_codes, 0)], -1)
+    prompt_rows = np.where(prompt_category_codes >= 0, row_of_code[np.maximum(prompt_category_codes, 0)], -1)
+    matched = prompt_rows >= 0
+
+    joined = feedback.take(matched)
+    matched_prompts = prompts.take(prompt_rows[matched])
+    columns = {**joined.columns, **{f"prompt.{name}": values for name, values in matched_prompts.columns.items()}}
+    categories = {
+        **joined.categories,
+        **{f"prompt.{name}": values for name, values in matched_prompts.categories.items()},
+    }
+    return Table(columns, categories)
+
+
+def time_bucket(table: Table, column: str = "created_on", freq: str = "D") -> "np.ndarray":
+    """
+    Floor a datetime column to a frequency, to group rows by time bucket:
+
+    ```python
+    group_by(feedback.with_column("day", time_bucket(feedback, freq="D")), by=["day", "model"])
+    ```
+
+    Args:
+        table: a table
+        column: a datetime64 column
+        freq: the frequency of buckets, one of ["h", "D", "W", "M"]. Weeks start on Mondays.
+    """
+    values = table.columns[column]
+    if freq == "W":
+        days = values.astype("datetime64[D]")
+        # 1970-01-01 (day 0) is a Thursday, so Mondays are days with (day - 4) % 7 == 0
+        return days - ((days.astype(np.int64) - 4) % 7).astype("timedelta64[D]")
+    if freq not in ("h", "D", "M"):
+        raise ValueError("freq must be one of ['h', 'D', 'W', 'M'].")
+    return values.astype(f"datetime64[{freq}]")
+
+
+def scores(table: Table, column: str = "user_response.score", mapping: Dict[str, float] = SCORES) -> "np.ndarray":
+    """
+    Convert feedback scores to numbers, NaN for unknown or missing scores.
+
+    Args:
+        table: a table of feedback
+        column: the dictionary encoded score column
+        mapping: numeric values of scores. Defaults to 👎 / 👍 as 0 / 1 and 😞 / 🙁 / 😐 / 🙂 / 😀 as 1 to 5.
+    """
+    category_values = np.array([mapping.get(category, np.nan) for category in table.categories[column]] + [np.nan])
+    # missing values (code -1) index the trailing NaN
+    return category_values[table.columns[column]]
@@ -1,3 +1,7 @@
+import json
+import os
+from typing import List, Optional
+
 import typer
 
 app = typer.Typer(pretty_exceptions_show_locals=False)
@@ -18,5 +22,41 @@ def main(
     return None
 
 
+@app.command()
+def watch(
+    component: str = typer.Argument(..., help="Feedback component name created in Trubrics."),
+    project: str = typer.Option("default", help="Trubrics project of the component."),
+    model: Optional[str] = typer.Option(None, help="Only watch feedback on this model."),
+    score: Optional[str] = typer.Option(None, help="Only watch feedback with this score, e.g. 👎."),
+    tag: List[str] = typer.Option([], help="Only watch feedback with any of these tags."),
+    field: Optional[List[str]] = typer.Option(None, help="Fields to read, e.g. user_response.score. Defaults to all."),
+    cursor_path: Optional[str] = typer.Option(None, help="File that saves the last seen feedback, to resume from."),
+    min_interval: float = typer.Option(1.0, help="Minimum number of seconds between polls."),
+    max_interval: float = typer.Option(60.0, help="Maximum number of seconds between polls."),
+):
+    """
+    Print new feedback of a component as JSON lines, as it is logged. Authenticates with the TRUBRICS_EMAIL and
+    TRUBRICS_PASSWORD environment variables.
+    """
+    from trubrics.platform import Trubrics
+
+    trubrics = Trubrics(email=os.environ["TRUBRICS_EMAIL"], password=os.environ["TRUBRICS_PASSWORD"], project=project)
+    watcher = trubrics.watch_feedback(
+        component=component,
+        model=model,
+        score=score,
+        tags=tag,
+        fields=field or None,
+        cursor_path=cursor_path,
+        min_interval=min_interval,
+        max_interval=max_interval,
+    )
+    try:
+        for feedback in watcher:
+            typer.echo(json.dumps(feedback, default=str, ensure_ascii=False))
+    except KeyboardInterrupt:
+        raise typer.Exit()
+
+
 if __name__ == "__main__":
     app()
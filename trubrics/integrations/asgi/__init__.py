@@ -0,0 +1,3 @@
+from trubrics.integrations.asgi.middleware import TrubricsMiddleware
+
+__all__ = ["TrubricsMiddleware"]
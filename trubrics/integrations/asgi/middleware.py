@@ -0,0 +1,64 @@
+import asyncio
+import os
+from typing import Optional
+
+from trubrics.integrations.request_logger import RequestLogger, WorkerClient
+from trubrics.platform import Trubrics
+
+
+class TrubricsMiddleware:
+    def __init__(
+        self,
+        app,
+        email: Optional[str] = None,
+        password: Optional[str] = None,
+        project: str = "default",
+        **trubrics_kwargs,
+    ):
+        """
+        An ASGI middleware (for FastAPI, Starlette, etc) that logs prompts & feedback to Trubrics after each response
+        has been sent. A single Trubrics client is created per worker process, on first use, and all pending prompts &
+        feedback are saved on lifespan shutdown.
+
+        The logger of each request is saved to `scope["state"]["trubrics"]`, e.g. `request.state.trubrics` in
+        Starlette & FastAPI.
+
+        Args:
+            app: an ASGI app
+            email: a Trubrics account email, defaults to the TRUBRICS_EMAIL environment variable
+            password: a Trubrics account password, defaults to the TRUBRICS_PASSWORD environment variable
+            project: a Trubrics project name
+            trubrics_kwargs: any other arguments of the `Trubrics` object
+        """
+        self.app = app
+        email = email or os.environ["TRUBRICS_EMAIL"]
+        password = password or os.environ["TRUBRICS_PASSWORD"]
+        self.worker_client = WorkerClient(
+            lambda: Trubrics(email=email, password=password, project=project, **trubrics_kwargs)
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.app(scope, self._flush_on_shutdown(receive), send)
+            return
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_logger = RequestLogger(self.worker_client.get)
+        scope.setdefault("state", {})["trubrics"] = request_logger
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # the response has been sent, queue logs without blocking the event loop (the client may sign in)
+            if request_logger.pending:
+                await asyncio.get_running_loop().run_in_executor(None, request_logger.send)
+
+    def _flush_on_shutdown(self, receive):
+        async def receive_and_flush():
+            message = await receive()
+            if message["type"] == "lifespan.shutdown":
+                await asyncio.get_running_loop().run_in_executor(None, self.worker_client.flush)
+            return message
+
+        return receive_and_flush
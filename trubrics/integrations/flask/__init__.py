@@ -0,0 +1,3 @@
+from trubrics.integrations.flask.extension import TrubricsFlask
+
+__all__ = ["TrubricsFlask"]
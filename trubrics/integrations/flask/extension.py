@@ -0,0 +1,73 @@
+import os
+from typing import Optional
+
+from flask import Flask, Response, g
+
+from trubrics.integrations.request_logger import RequestLogger, WorkerClient
+from trubrics.platform import Trubrics
+
+
+class TrubricsFlask:
+    def __init__(
+        self,
+        app: Optional[Flask] = None,
+        email: Optional[str] = None,
+        password: Optional[str] = None,
+        project: Optional[str] = None,
+        **trubrics_kwargs,
+    ):
+        """
+        A Flask extension that logs prompts & feedback to Trubrics after each response has been sent, adding no
+        latency to requests. A single Trubrics client is created per worker process, on first use.
+
+        Args:
+            app: a Flask app, or None to call `init_app()` later
+            email: a Trubrics account email, defaults to the TRUBRICS_EMAIL app config or environment variable
+            password: a Trubrics account password, defaults to the TRUBRICS_PASSWORD app config or environment variable
+            project: a Trubrics project name, defaults to the TRUBRICS_PROJECT app config or "default"
+            trubrics_kwargs: any other arguments of the `Trubrics` object
+        """
+        self.email = email
+        self.password = password
+        self.project = project
+        self.trubrics_kwargs = trubrics_kwargs
+        self.worker_client: Optional[WorkerClient] = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        email = self.email or app.config.get("TRUBRICS_EMAIL") or os.environ["TRUBRICS_EMAIL"]
+        password = self.password or app.config.get("TRUBRICS_PASSWORD") or os.environ["TRUBRICS_PASSWORD"]
+        project = self.project or app.config.get("TRUBRICS_PROJECT", "default")
+        self.worker_client = WorkerClient(
+            lambda: Trubrics(email=email, password=password, project=project, **self.trubrics_kwargs)
+        )
+        app.extensions["trubrics"] = self
+        app.after_request(self._after_request)
+
+    @property
+    def client(self) -> Trubrics:
+        """The Trubrics client of this worker process."""
+        return self.worker_client.get()  # type: ignore
+
+    @property
+    def logger(self) -> RequestLogger:
+        """The logger of the current request. Prompts & feedback are saved once the response has been sent."""
+        if "trubrics_logger" not in g:
+            g.trubrics_logger = RequestLogger(self.worker_client.get)  # type: ignore
+        return g.trubrics_logger
+
+    def flush(self):
+        """
+        Wait for all prompts & feedback of this worker to be saved. Queued prompts & feedback are also saved when the
+        worker process exits, by the background writer of the client.
+        """
+        if self.worker_client is not None:
+            self.worker_client.flush()
+
+    @staticmethod
+    def _after_request(response: Response) -> Response:
+        request_logger = g.pop("trubrics_logger", None)
+        if request_logger is not None and request_logger.pending:
+            response.call_on_close(request_logger.send)
+        return response
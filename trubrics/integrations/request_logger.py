@@ -0,0 +1,102 @@
+"""
+Request scoped logging for web apps, saving prompts & feedback to Trubrics after the response has been sent.
+"""
+import os
+import threading
+from typing import Callable, List, Optional, Tuple
+
+from loguru import logger
+
+from trubrics.platform import Trubrics
+from trubrics.platform.firestore import generate_document_id
+from trubrics.platform.forking import register_at_fork
+
+
+class WorkerClient:
+    def __init__(self, factory: Callable[[], Trubrics]):
+        """
+        A single Trubrics client per worker process, created on first use.
+
+        Args:
+            factory: a function that creates an authenticated Trubrics client
+        """
+        self.factory = factory
+        self._client: Optional[Trubrics] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        register_at_fork(self)
+
+    def _before_fork(self):
+        pass
+
+    def _after_fork_in_child(self):
+        # the client of the parent is replaced on first use, but its lock may have been held by another thread
+        self._lock = threading.Lock()
+
+    def get(self) -> Trubrics:
+        if self._client is None or self._pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._pid != os.getpid():
+                    self._client = self.factory()
+                    self._pid = os.getpid()
+        return self._client
+
+    def flush(self):
+        """Wait for all prompts & feedback of this worker to be saved."""
+        if self._client is not None and self._pid == os.getpid():
+            self._client.flush()
+
+
+class RequestLogger:
+    def __init__(self, get_client: Callable[[], Trubrics]):
+        """
+        Collect the prompts & feedback logged whilst handling a request. Nothing is sent until `send()` is called
+        once the response has been sent, and documents are then saved by the background writer of the client.
+
+        Args:
+            get_client: a function returning the Trubrics client of the worker
+        """
+        self.get_client = get_client
+        self._calls: List[Tuple[str, dict]] = []
+
+    @property
+    def pending(self) -> bool:
+        return len(self._calls) > 0
+
+    def log_prompt(self, config_model: dict, prompt: str, generation: str, **kwargs) -> str:
+        """
+        Log a user prompt once the response has been sent. Takes the same arguments as `Trubrics.log_prompt()`.
+
+        Returns:
+            the id of the prompt, for example to return to the frontend to log feedback on the prompt
+        """
+        kwargs["prompt_id"] = kwargs.get("prompt_id") or generate_document_id()
+        self._calls.append(
+            ("log_prompt", {"config_model": config_model, "prompt": prompt, "generation": generation, **kwargs})
+        )
+        return kwargs["prompt_id"]
+
+    def log_feedback(self, component: str, model: str, user_response: dict, **kwargs) -> str:
+        """
+        Log user feedback once the response has been sent. Takes the same arguments as `Trubrics.log_feedback()`.
+
+        Returns:
+            the id of the feedback
+        """
+        kwargs["feedback_id"] = kwargs.get("feedback_id") or generate_document_id()
+        self._calls.append(
+            ("log_feedback", {"component": component, "model": model, "user_response": user_response, **kwargs})
+        )
+        return kwargs["feedback_id"]
+
+    def send(self):
+        """Queue all logged prompts & feedback on the background writer of the client."""
+        calls, self._calls = self._calls, []
+        if not calls:
+            return
+        client = self.get_client()
+        for method, kwargs in calls:
+            try:
+                getattr(client, method)(**kwargs, background=True)
+            except Exception as err:
+                logger.error(f"Error logging to Trubrics with {method}: {str(err)}.")
@@ -5,6 +5,7 @@ from streamlit_feedback import streamlit_feedback
 
 from trubrics import Trubrics
 from trubrics.platform.feedback import Feedback, Response
+from trubrics.platform.firestore import generate_document_id
 
 
 class FeedbackCollector(Trubrics):
@@ -48,6 +49,7 @@ class FeedbackCollector(Trubrics):
         align: str = "flex-end",
         disable_with_score: Optional[str] = None,
         success_fail_message: bool = True,
+        upsert_window: Optional[float] = None,
     ) -> Optional[dict]:
         """
         Collect ML model user feedback with UI components from a Streamlit app.
@@ -72,9 +74,23 @@ class FeedbackCollector(Trubrics):
                 Can be used to pass state from one component to another.
             align: where to align the feedback component ["flex-end", "center", "flex-start"]
             success_fail_message: whether to display an st.toast message on feedback submission.
+            upsert_window: if set, all feedback from this component (with this `key` and `prompt_id`) is saved to a
+                single document, updated by each new interaction of the user. Interactions within `upsert_window`
+                seconds are merged and saved with a single write.
         """
         if key is None:
             key = feedback_type
+        upsert_kwargs = {}
+        if upsert_window is not None:
+            # one feedback document per component & prompt, as the same key may be reused for feedback on each prompt
+            feedback_id_key = f"{key}_{prompt_id}_feedback_id"
+            if feedback_id_key not in st.session_state:
+                st.session_state[feedback_id_key] = generate_document_id()
+            upsert_kwargs = {
+                "feedback_id": st.session_state[feedback_id_key],
+                "upsert": True,
+                "upsert_window": upsert_window,
+            }
         if feedback_type == "textbox":
             text = self.st_textbox_ui(type=textbox_type, key=key, label=open_feedback_label)
             if text:
@@ -88,6 +104,7 @@ class FeedbackCollector(Trubrics):
                         metadata=metadata,
                         tags=tags,
                         user_id=user_id,
+                        **upsert_kwargs,
                     )
                     if feedback is None:
                         error_msg = "Error in pushing feedback issue to Trubrics."
@@ -132,6 +149,7 @@ class FeedbackCollector(Trubrics):
                     "metadata": metadata,
                     "tags": tags,
                     "user_id": user_id,
+                    **upsert_kwargs,
                 },
                 align=align,
                 key=key,
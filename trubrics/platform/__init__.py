@@ -1,54 +1,296 @@
-from typing import Optional
+import atexit
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple, Union
 
 from loguru import logger
+from pydantic import BaseModel
 
 from trubrics.platform.auth import expire_after_n_seconds, get_trubrics_auth_token
+from trubrics.platform.auth_cache import AuthCache
+from trubrics.platform.backends import DocumentWrite, FirestoreBackend, StorageBackend
 from trubrics.platform.config import TrubricsConfig, TrubricsDefaults
+from trubrics.platform.debounce import FeedbackDebouncer
 from trubrics.platform.feedback import Feedback, Response
 from trubrics.platform.firestore import (
+    MAX_AGGREGATIONS_PER_QUERY,
+    build_structured_query,
+    field_filter,
+    generate_document_id,
     get_trubrics_firestore_api_url,
-    list_components_in_organisation,
-    list_projects_in_organisation,
-    save_document_to_collection,
+    run_aggregation_query,
 )
+from trubrics.platform.forking import flush_before_fork, register_at_fork
 from trubrics.platform.prompts import ModelConfig, Prompt
+from trubrics.platform.sessions import Session, SessionConfig, Turn
+from trubrics.platform.tracing import GenerationTrace
+from trubrics.platform.watch import FeedbackWatcher
+from trubrics.platform.worker import BackgroundWriter
 
 
 class Trubrics:
     def __init__(
         self,
-        email: str,
-        password: str,
-        project: str,
+        email: Optional[str] = None,
+        password: Optional[str] = None,
+        project: str = "default",
         firebase_api_key: Optional[str] = None,
         firebase_project_id: Optional[str] = None,
+        auth_cache_path: Optional[str] = None,
+        backend: Optional[StorageBackend] = None,
     ):
-        if firebase_api_key or firebase_project_id:
-            if firebase_api_key and firebase_project_id:
-                defaults = TrubricsDefaults(firebase_api_key=firebase_api_key, firebase_project_id=firebase_project_id)
-            else:
-                raise ValueError("Both API key and firebase_project_id are required to change project.")
+        """
+        Args:
+            email: a Trubrics account email, required unless a local `backend` is given
+            password: a Trubrics account password, required unless a local `backend` is given
+            project: the default Trubrics project to log to. Any other project of the organisation may be selected
+                per call, with the `project` argument of the logging methods.
+            firebase_api_key: an optional firebase api key, for self hosted Trubrics
+            firebase_project_id: an optional firebase project id, for self hosted Trubrics
+            auth_cache_path: an optional path to a file that caches auth tokens & organisation urls across processes,
+                defaults to the TRUBRICS_AUTH_CACHE_PATH environment variable. No file cache is used if neither is set.
+            backend: an optional storage backend to log to instead of the hosted Trubrics, such as a `SQLiteBackend`.
+                No Trubrics account is used with a local backend.
+        """
+        if backend is not None:
+            self.config = TrubricsConfig(project=project)
+            projects = backend.list_projects()
         else:
-            defaults = TrubricsDefaults()
+            if email is None or password is None:
+                raise ValueError("A Trubrics email & password are required, unless a local storage backend is given.")
+            if firebase_api_key or firebase_project_id:
+                if firebase_api_key and firebase_project_id:
+                    defaults = TrubricsDefaults(
+                        firebase_api_key=firebase_api_key, firebase_project_id=firebase_project_id
+                    )
+                else:
+                    raise ValueError("Both API key and firebase_project_id are required to change project.")
+            else:
+                defaults = TrubricsDefaults()
 
-        auth = get_trubrics_auth_token(defaults.firebase_api_key, email, password, rerun=expire_after_n_seconds())
-        if "error" in auth:
-            raise Exception(f"Error while authenticating '{email}' with Trubrics: {auth['error']}")
-        else:
-            firestore_api_url = get_trubrics_firestore_api_url(auth, defaults.firebase_project_id)
+            auth_cache_path = auth_cache_path or os.environ.get("TRUBRICS_AUTH_CACHE_PATH")
+            auth_cache = AuthCache(auth_cache_path) if auth_cache_path else None
+
+            if auth_cache is not None:
+                auth = auth_cache.get_auth(defaults.firebase_api_key, email, password)
+            else:
+                auth = get_trubrics_auth_token(
+                    defaults.firebase_api_key, email, password, rerun=expire_after_n_seconds()
+                )
+            if "error" in auth:
+                raise Exception(f"Error while authenticating '{email}' with Trubrics: {auth['error']}")
 
-        projects = list_projects_in_organisation(firestore_api_url, auth)
+            firestore_api_url: Optional[str] = None
+            cached_projects: Optional[List[str]] = None
+            if auth_cache is not None:
+                firestore_api_url = auth_cache.get(defaults.firebase_api_key, email, "firestore_api_url")
+                cached_projects = auth_cache.get(defaults.firebase_api_key, email, "projects")
+            if firestore_api_url is None:
+                firestore_api_url = get_trubrics_firestore_api_url(auth, defaults.firebase_project_id)
+                if auth_cache is not None:
+                    auth_cache.set(defaults.firebase_api_key, email, firestore_api_url=firestore_api_url)
+            backend = FirestoreBackend(
+                firebase_api_key=defaults.firebase_api_key,
+                email=email,
+                password=password,
+                firestore_api_url=firestore_api_url,
+                auth_cache=auth_cache,
+            )
+            if cached_projects is not None and project in cached_projects:
+                projects = cached_projects
+            else:
+                projects = backend.list_projects()
+            self.config = TrubricsConfig(
+                email=email,
+                password=password,  # type: ignore
+                project=project,
+                username=auth["displayName"],
+                firebase_api_key=defaults.firebase_api_key,
+                firestore_api_url=firestore_api_url,
+            )
         if project not in projects:
             raise KeyError(f"Project '{project}' not found. Please select one of {projects}.")
 
-        self.config = TrubricsConfig(
-            email=email,
-            password=password,  # type: ignore
-            project=project,
-            username=auth["displayName"],
-            firebase_api_key=defaults.firebase_api_key,
-            firestore_api_url=firestore_api_url,
+        self.backend = backend
+        self._projects = projects
+        self._components: Dict[str, List[str]] = {}
+        self._sessions: Dict[Tuple[str, str], Session] = {}
+        self._flush_at_exit = False
+        self._writer: Optional[BackgroundWriter] = None
+        self._debouncer: Optional[FeedbackDebouncer] = None
+        register_at_fork(self)
+
+    def _before_fork(self):
+        # flush in the parent, so that pending data is not inherited (and sent again) by children
+        flush_before_fork(self.flush)
+
+    def _after_fork_in_child(self):
+        # auth tokens & metadata caches are kept, as they are still valid in children
+        self.backend._after_fork_in_child()
+        if self._writer is not None:
+            self._writer._reset()
+        if self._debouncer is not None:
+            self._debouncer._reset()
+        for session in self._sessions.values():
+            session._reset()
+
+    def _get_firestore_backend(self, feature: str) -> FirestoreBackend:
+        """Return the hosted Trubrics backend of the client, for features that are only available on Trubrics."""
+        if not isinstance(self.backend, FirestoreBackend):
+            raise ValueError(f"{feature} requires the hosted Trubrics backend, not a {type(self.backend).__name__}.")
+        return self.backend
+
+    def _get_writer(self) -> BackgroundWriter:
+        if self._writer is None:
+            self._writer = BackgroundWriter(client=self)
+        return self._writer
+
+    def _get_debouncer(self) -> FeedbackDebouncer:
+        if self._debouncer is None:
+            self._debouncer = FeedbackDebouncer(client=self)
+        return self._debouncer
+
+    def _submit(self, project: str, collection: str, document: BaseModel, upsert: bool = False):
+        """Queue a document to be saved (or upserted) to Trubrics by the background writer."""
+        document_dict = document.dict()
+        document_id = document_dict.pop("id")
+        self._get_writer().submit(DocumentWrite(project, collection, document_id, document_dict, upsert))
+
+    def _get_project(self, project: Optional[str]) -> str:
+        """Return the project to log to, defaulting to the project of the client."""
+        if project is None:
+            return self.config.project
+        if project not in self._projects:
+            self._projects = self.backend.list_projects()
+            if project not in self._projects:
+                raise KeyError(f"Project '{project}' not found. Please select one of {self._projects}.")
+        return project
+
+    def _check_component(self, component: str, project: str):
+        """Check that a feedback component exists, listing the components of a project once per client."""
+        if component not in self._components.get(project, []):
+            self._components[project] = self.backend.list_components(project)
+            if component not in self._components[project]:
+                raise ValueError(
+                    f"Component '{component}' not found. Please select one of: {self._components[project]}."
+                )
+
+    def session(
+        self,
+        session_id: str,
+        config_model: dict,
+        user_id: Optional[str] = None,
+        tags: list = [],
+        metadata: dict = {},
+        batch_size: int = 10,
+        project: Optional[str] = None,
+    ) -> Session:
+        """
+        Open a session to log the turns of a conversation to Trubrics. The session config & metadata are saved once
+        per session, and each turn is saved as a small append-only document, written in batches.
+
+        Calling this method again with the same `session_id` returns the already opened session, until the session is
+        closed by exiting it as a context manager.
+
+        Parameters:
+            session_id: session id, for example for a chatbot conversation
+            config_model: model configuration with fields "model", "prompt_template", "temperature"
+            user_id: user id
+            tags: session tags
+            metadata: any session metadata, such as a system prompt
+            batch_size: the number of turns to buffer before writing them to Trubrics
+            project: the project to log to, defaults to the project of the client
+        """
+        project = self._get_project(project)
+        if (project, session_id) not in self._sessions:
+            if not self._flush_at_exit:
+                atexit.register(self.flush)
+                self._flush_at_exit = True
+            session_config = SessionConfig(
+                session_id=session_id,
+                config_model=ModelConfig(**config_model),
+                user_id=user_id,
+                tags=tags,
+                metadata=metadata,
+            )
+            self._sessions[(project, session_id)] = Session(
+                client=self, config=session_config, project=project, batch_size=batch_size
+            )
+        return self._sessions[(project, session_id)]
+
+    def flush(self):
+        """
+        Write all buffered session turns to Trubrics, with the sessions of each project grouped into shared commits,
+        and wait for all background writes to complete.
+        """
+        if self._debouncer is not None:
+            self._debouncer.flush()
+        if self._writer is not None:
+            self._writer.flush()
+        projects: Dict[str, List[Tuple[Session, List[Turn], List[DocumentWrite]]]] = {}
+        for session in list(self._sessions.values()):
+            turns, session_writes = session._take_writes()
+            if turns or not session._config_saved:
+                projects.setdefault(session.project, []).append((session, turns, session_writes))
+        for sessions in projects.values():
+            # commits are split at the batch size of the backend, including within the writes of a session
+            writes = [write for _, _, session_writes in sessions for write in session_writes]
+            batch_size = self.backend.batch_size
+            results: List[dict] = []
+            for start in range(0, len(writes), batch_size):
+                end = start + batch_size
+                batch = writes[start:end]
+                results.extend([self.backend.commit(batch)] * len(batch))
+            session_results = iter(results)
+            for session, turns, session_writes in sessions:
+                res = [next(session_results) for _ in session_writes]
+                session._on_commit(turns, next((r for r in res if "error" in r), {}))
+
+    def trace_generation(
+        self,
+        config_model: dict,
+        prompt: str,
+        user_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+        tags: list = [],
+        metadata: dict = {},
+        prompt_id: Optional[str] = None,
+        project: Optional[str] = None,
+    ) -> GenerationTrace:
+        """
+        Trace a streamed model generation. Wrap the stream with `trace.stream()`, and the prompt is logged to Trubrics
+        from a background thread when the context manager exits, with the time to first token, latency, number of
+        chunks and chunks per second saved to its metadata:
+
+        ```python
+        with trubrics.trace_generation(config_model={"model": "gpt-3.5-turbo"}, prompt=prompt) as trace:
+            for token in trace.stream(generate(prompt)):
+                print(token, end="")
+        prompt_id = trace.prompt_id
+        ```
+
+        Parameters:
+            config_model: model configuration with fields "model", "prompt_template", "temperature"
+            prompt: user prompt to the model
+            user_id: user id
+            session_id: session id, for example for a chatbot conversation
+            tags: prompt tags
+            metadata: any prompt metadata
+            prompt_id: an optional prompt id, generated client side if not given
+            project: the project to log to, defaults to the project of the client
+        """
+        project = self._get_project(project)
+        logged_prompt = Prompt(
+            id=prompt_id or generate_document_id(),
+            config_model=ModelConfig(**config_model),
+            prompt=prompt,
+            generation="",
+            user_id=user_id,
+            session_id=session_id,
+            tags=tags,
+            metadata=metadata,
         )
+        return GenerationTrace(client=self, prompt=logged_prompt, project=project)
 
     def log_prompt(
         self,
@@ -59,6 +301,9 @@ class Trubrics:
         session_id: Optional[str] = None,
         tags: list = [],
         metadata: dict = {},
+        prompt_id: Optional[str] = None,
+        project: Optional[str] = None,
+        background: bool = False,
     ) -> Optional[Prompt]:
         """
         Log user prompts to Trubrics.
@@ -71,9 +316,14 @@ class Trubrics:
             session_id: session id, for example for a chatbot conversation
             tags: feedback tags
             metadata: any feedback metadata
+            prompt_id: an optional prompt id, generated client side if not given. Saving the same id twice is a no-op.
+            project: the project to log to, defaults to the project of the client
+            background: whether to save the prompt from a background thread, returning the prompt straight away
         """
+        project = self._get_project(project)
         config_model = ModelConfig(**config_model)
         prompt = Prompt(
+            id=prompt_id or generate_document_id(),
             config_model=config_model,
             prompt=prompt,
             generation=generation,
@@ -82,25 +332,18 @@ class Trubrics:
             tags=tags,
             metadata=metadata,
         )
-        auth = get_trubrics_auth_token(
-            self.config.firebase_api_key,
-            self.config.email,
-            self.config.password.get_secret_value(),
-            rerun=expire_after_n_seconds(),
-        )
-        res = save_document_to_collection(
-            auth,
-            firestore_api_url=self.config.firestore_api_url,
-            project=self.config.project,
-            collection="prompts",
-            document=prompt,
+        if background:
+            self._submit(project, collection="prompts", document=prompt)
+            return prompt
+        prompt_dict = prompt.dict()
+        res = self.backend.save_document(
+            project, collection="prompts", document_id=prompt_dict.pop("id"), document=prompt_dict
         )
         if "error" in res:
             logger.error(res["error"])
             return None
         else:
             logger.info("User prompt saved to Trubrics.")
-            prompt.id = res["name"].split("/")[-1]
             return prompt
 
     def log_feedback(
@@ -112,6 +355,11 @@ class Trubrics:
         user_id: Optional[str] = None,
         tags: list = [],
         metadata: dict = {},
+        feedback_id: Optional[str] = None,
+        project: Optional[str] = None,
+        background: bool = False,
+        upsert: bool = False,
+        upsert_window: float = 0.0,
     ) -> Optional[Feedback]:
         """
         Log user feedback to Trubrics.
@@ -124,9 +372,21 @@ class Trubrics:
             user_id: a user_id
             tags: feedback tags
             metadata: any feedback metadata
+            feedback_id: an optional feedback id, generated client side if not given. Saving the same id twice is a
+                no-op.
+            project: the project to log to, defaults to the project of the client
+            background: whether to save the feedback from a background thread, returning the feedback straight away
+            upsert: whether to create or update the feedback with id `feedback_id`, rather than only creating it. Use
+                this to save successive interactions of a user with a feedback component to a single document.
+            upsert_window: if upserting, the number of seconds to wait for further feedback with the same id. All
+                feedback logged within the window is merged client side and saved with a single write.
         """
+        if upsert and feedback_id is None:
+            raise ValueError("A `feedback_id` is required to upsert feedback.")
+        project = self._get_project(project)
         user_response = Response(**user_response)
         feedback = Feedback(
+            id=feedback_id or generate_document_id(),
             component=component,
             model=model,
             user_response=user_response,
@@ -135,27 +395,222 @@ class Trubrics:
             tags=tags,
             metadata=metadata,
         )
-        auth = get_trubrics_auth_token(
-            self.config.firebase_api_key,
-            self.config.email,
-            self.config.password.get_secret_value(),
-            rerun=expire_after_n_seconds(),
-        )
-        components = list_components_in_organisation(
-            firestore_api_url=self.config.firestore_api_url, auth=auth, project=self.config.project
-        )
-        if feedback.component not in components:
-            raise ValueError(f"Component '{feedback.component}' not found. Please select one of: {components}.")
-        res = save_document_to_collection(
-            auth,
-            firestore_api_url=self.config.firestore_api_url,
-            project=self.config.project,
-            collection=f"feedback/{feedback.component}/responses",
-            document=feedback,
-        )
+        self._check_component(feedback.component, project)
+        collection = f"feedback/{feedback.component}/responses"
+        if upsert and upsert_window > 0:
+            self._get_debouncer().submit(project, feedback=feedback, window=upsert_window)
+            return feedback
+        if background:
+            self._submit(project, collection=collection, document=feedback, upsert=upsert)
+            return feedback
+        feedback_dict = feedback.dict()
+        document_id = feedback_dict.pop("id")
+        if upsert:
+            res = self.backend.upsert_document(
+                project, collection=collection, document_id=document_id, document=feedback_dict
+            )
+        else:
+            res = self.backend.save_document(
+                project, collection=collection, document_id=document_id, document=feedback_dict
+            )
         if "error" in res:
             logger.error(res["error"])
             return None
         else:
             logger.info("User feedback saved to Trubrics.")
             return feedback
+
+    @staticmethod
+    def _feedback_filters(
+        model: Optional[str] = None,
+        score: Optional[str] = None,
+        tags: Union[str, List[str]] = [],
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+    ) -> List[dict]:
+        """Build the structured query filters of feedback responses."""
+        filters = []
+        if model is not None:
+            filters.append(field_filter("model", "EQUAL", model))
+        if score is not None:
+            filters.append(field_filter("user_response.score", "EQUAL", score))
+        if isinstance(tags, str):
+            filters.append(field_filter("tags", "ARRAY_CONTAINS", tags))
+        elif tags:
+            filters.append(field_filter("tags", "ARRAY_CONTAINS_ANY", list(tags)))
+        for op, created_on in (("GREATER_THAN_OR_EQUAL", created_after), ("LESS_THAN", created_before)):
+            if created_on is not None:
+                if created_on.tzinfo is not None:
+                    # created_on is saved as a naive UTC datetime
+                    created_on = created_on.astimezone(timezone.utc).replace(tzinfo=None)
+                filters.append(field_filter("created_on", op, created_on))
+        return filters
+
+    def aggregate_feedback(
+        self,
+        component: str,
+        sum_fields: List[str] = [],
+        avg_fields: List[str] = [],
+        model: Optional[str] = None,
+        score: Optional[str] = None,
+        tags: Union[str, List[str]] = [],
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        project: Optional[str] = None,
+    ) -> Optional[dict]:
+        """
+        Count feedback responses of a component, and sum / average any numeric fields, server side. Only the
+        aggregated values are downloaded, rather than all feedback responses:
+
+        ```python
+        trubrics.aggregate_feedback(component="default", avg_fields=["metadata.latency"], model="gpt-4", score="👎")
+        # {"count": 12, "sum": {}, "avg": {"metadata.latency": 1.3}}
+        ```
+
+        Filters on several fields, or on a field and a `created_on` range, may require a composite index, that
+        Firestore links to in the returned error.
+
+        Parameters:
+            component: feedback component name created in Trubrics
+            sum_fields: dotted paths of numeric fields to sum, e.g. "metadata.n_tokens"
+            avg_fields: dotted paths of numeric fields to average. Documents with a missing or non numeric field are
+                ignored.
+            model: only aggregate feedback on this model
+            score: only aggregate feedback with this `user_response.score`, e.g. "👎"
+            tags: only aggregate feedback with this tag, or with any of these tags
+            created_after: only aggregate feedback created on or after this datetime (naive datetimes are in UTC)
+            created_before: only aggregate feedback created before this datetime (naive datetimes are in UTC)
+            project: the project of the component, defaults to the project of the client
+
+        Returns:
+            a dict with the "count" of feedback, and the "sum" and "avg" of each field
+        """
+        backend = self._get_firestore_backend("Feedback aggregations")
+        if 1 + len(sum_fields) + len(avg_fields) > MAX_AGGREGATIONS_PER_QUERY:
+            raise ValueError(f"At most {MAX_AGGREGATIONS_PER_QUERY - 1} fields may be summed or averaged at once.")
+        project = self._get_project(project)
+        self._check_component(component, project)
+        aggregations = [{"alias": "count", "count": {}}]
+        for i, field in enumerate(sum_fields):
+            aggregations.append({"alias": f"sum_{i}", "sum": {"field": {"fieldPath": field}}})
+        for i, field in enumerate(avg_fields):
+            aggregations.append({"alias": f"avg_{i}", "avg": {"field": {"fieldPath": field}}})
+        res = run_aggregation_query(
+            backend.get_auth(),
+            parent_url=backend.firestore_api_url + f"/projects/{project}/feedback/{component}",
+            structured_query=build_structured_query(
+                "responses",
+                filters=self._feedback_filters(
+                    model=model,
+                    score=score,
+                    tags=tags,
+                    created_after=created_after,
+                    created_before=created_before,
+                ),
+            ),
+            aggregations=aggregations,
+        )
+        if "error" in res:
+            logger.error(res["error"])
+            return None
+        return {
+            "count": res["count"],
+            "sum": {field: res[f"sum_{i}"] for i, field in enumerate(sum_fields)},
+            "avg": {field: res[f"avg_{i}"] for i, field in enumerate(avg_fields)},
+        }
+
+    def count_feedback(
+        self,
+        component: str,
+        model: Optional[str] = None,
+        score: Optional[str] = None,
+        tags: Union[str, List[str]] = [],
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        project: Optional[str] = None,
+    ) -> Optional[int]:
+        """
+        Count feedback responses of a component server side, e.g. the number of 👎 for a model this week:
+
+        ```python
+        trubrics.count_feedback(
+            component="default", model="gpt-4", score="👎", created_after=datetime.utcnow() - timedelta(days=7)
+        )
+        ```
+
+        Parameters:
+            component: feedback component name created in Trubrics
+            model: only count feedback on this model
+            score: only count feedback with this `user_response.score`, e.g. "👎"
+            tags: only count feedback with this tag, or with any of these tags
+            created_after: only count feedback created on or after this datetime (naive datetimes are in UTC)
+            created_before: only count feedback created before this datetime (naive datetimes are in UTC)
+            project: the project of the component, defaults to the project of the client
+        """
+        res = self.aggregate_feedback(
+            component,
+            model=model,
+            score=score,
+            tags=tags,
+            created_after=created_after,
+            created_before=created_before,
+            project=project,
+        )
+        return None if res is None else res["count"]
+
+    def watch_feedback(
+        self,
+        component: str,
+        model: Optional[str] = None,
+        score: Optional[str] = None,
+        tags: Union[str, List[str]] = [],
+        fields: Optional[List[str]] = None,
+        since: Optional[datetime] = None,
+        cursor_path: Optional[str] = None,
+        min_interval: float = 1.0,
+        max_interval: float = 60.0,
+        project: Optional[str] = None,
+    ) -> FeedbackWatcher:
+        """
+        Watch a feedback component for new feedback, e.g. to alert on negative feedback. Only feedback created since
+        the last poll is read, and polls are spaced out whilst no new feedback is logged:
+
+        ```python
+        for feedback in trubrics.watch_feedback(component="default", score="👎", fields=["model", "user_response"]):
+            print(feedback["id"], feedback["model"])
+        ```
+
+        Filtering on `model`, `score` or `tags` requires a composite index with `created_on`, that Firestore links to
+        in the logged error.
+
+        Parameters:
+            component: feedback component name created in Trubrics
+            model: only watch feedback on this model
+            score: only watch feedback with this `user_response.score`, e.g. "👎"
+            tags: only watch feedback with this tag, or with any of these tags
+            fields: dotted paths of the fields to read, e.g. "user_response.score". All fields are read by default.
+            since: watch feedback created on or after this datetime (naive datetimes are in UTC), defaults to now
+            cursor_path: an optional path to a file that saves the last seen feedback, to resume watching from
+            min_interval: the minimum number of seconds between polls
+            max_interval: the maximum number of seconds between polls, when no new feedback is logged
+            project: the project of the component, defaults to the project of the client
+
+        Returns:
+            an iterable of new feedback dicts, that polls for new feedback indefinitely
+        """
+        backend = self._get_firestore_backend("Watching feedback")
+        project = self._get_project(project)
+        self._check_component(component, project)
+        if since is not None and since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        return FeedbackWatcher(
+            backend=backend,
+            project=project,
+            component=component,
+            filters=self._feedback_filters(model=model, score=score, tags=tags),
+            fields=fields,
+            since=since,
+            cursor_path=cursor_path,
+            min_interval=min_interval,
+            max_interval=max_interval,
+        )
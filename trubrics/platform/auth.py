@@ -3,9 +3,10 @@ import time
 from functools import lru_cache
 from typing import Dict
 
-import requests  # type: ignore
 from loguru import logger
 
+from trubrics.platform.transport import TransportError, get_transport
+
 
 def expire_after_n_seconds(seconds=600):
     """Return the same value within `seconds` time period."""
@@ -14,7 +15,7 @@ def expire_after_n_seconds(seconds=600):
 
 def reset_trubrics_password(firebase_api_key, email) -> Dict[str, str]:
     try:
-        r = requests.post(
+        r = get_transport().post(
             f"https://identitytoolkit.googleapis.com/v1/accounts:sendOobCode?key={firebase_api_key}",
             headers={"Content-Type": "application/json"},
             data=json.dumps({"requestType": "PASSWORD_RESET", "email": email}),
@@ -24,14 +25,14 @@ def reset_trubrics_password(firebase_api_key, email) -> Dict[str, str]:
         auth_response = json.loads(r.text)
         logger.info(f"User password link for {email} has been sent.")
         return auth_response
-    except requests.exceptions.RequestException as err:
+    except TransportError as err:
         logger.error(f"Error sending rest password link for {email}: {str(err)}.")
         return {"error": str(err)}
 
 
 def create_trubrics_account(firebase_api_key, email, password) -> Dict[str, str]:
     try:
-        r = requests.post(
+        r = get_transport().post(
             f"https://identitytoolkit.googleapis.com/v1/accounts:signUp?key={firebase_api_key}",
             headers={"Content-Type": "application/json"},
             data=json.dumps({"email": email, "password": password}),
@@ -41,7 +42,7 @@ def create_trubrics_account(firebase_api_key, email, password) -> Dict[str, str]
         auth_response = json.loads(r.text)
         logger.info(f"User account {email} has been created.")
         return auth_response
-    except requests.exceptions.RequestException as err:
+    except TransportError as err:
         logger.error(f"Error creating account for {email}: {str(err)}.")
         return {"error": str(err)}
 
@@ -50,7 +51,7 @@ def create_trubrics_account(firebase_api_key, email, password) -> Dict[str, str]
 def get_trubrics_auth_token(firebase_api_key, email, password, rerun=None) -> Dict[str, str]:
     del rerun  # this variable is just used to force a refresh of lru_cache
     try:
-        r = requests.post(
+        r = get_transport().post(
             f"https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={firebase_api_key}",
             headers={"Content-Type": "application/json"},
             data=json.dumps({"email": email, "password": password, "returnSecureToken": True}),
@@ -64,7 +65,32 @@ def get_trubrics_auth_token(firebase_api_key, email, password, rerun=None) -> Di
             "email": auth_response["email"],
             "uid": auth_response["localId"],
             "displayName": auth_response["displayName"],
+            "refreshToken": auth_response["refreshToken"],
+            "expiresIn": auth_response["expiresIn"],
         }
-    except requests.exceptions.RequestException as err:
+    except TransportError as err:
         logger.error(f"Error authenticating {email}: {str(err)}.")
         return {"error": str(err)}
+
+
+def refresh_trubrics_auth_token(firebase_api_key, refresh_token) -> Dict[str, str]:
+    """Exchange a refresh token for a new ID token, without signing in again with a password."""
+    try:
+        r = get_transport().post(
+            f"https://securetoken.googleapis.com/v1/token?key={firebase_api_key}",
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            data={"grant_type": "refresh_token", "refresh_token": refresh_token},
+            timeout=5000,
+        )
+        r.raise_for_status()
+        auth_response = json.loads(r.text)
+        logger.info("Trubrics auth token has been refreshed.")
+        return {
+            "idToken": auth_response["id_token"],
+            "uid": auth_response["user_id"],
+            "refreshToken": auth_response["refresh_token"],
+            "expiresIn": auth_response["expires_in"],
+        }
+    except TransportError as err:
+        logger.error(f"Error refreshing auth token: {str(err)}.")
+        return {"error": str(err)}
@@ -0,0 +1,148 @@
+"""
+File backed cache of auth tokens & organisation urls, shared by all processes on a host.
+"""
+import hashlib
+import hmac
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from loguru import logger
+
+from trubrics.platform.auth import get_trubrics_auth_token, refresh_trubrics_auth_token
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # no file locking on windows, concurrent processes may sign in more than once
+    fcntl = None  # type: ignore
+
+# refresh tokens this many seconds before they expire
+EXPIRY_MARGIN_SECONDS = 300
+# iterations of the salted password hash, checked once per process when reading a token from the cache file
+PASSWORD_HASH_ITERATIONS = 100_000
+
+
+def _hash_password(password: str, salt: bytes) -> str:
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, PASSWORD_HASH_ITERATIONS).hex()
+
+
+class AuthCache:
+    def __init__(self, path: str):
+        """
+        A file backed cache of ID tokens, refresh tokens, token expiries and organisation urls. Cached tokens are
+        only returned for the password that signed in, checked against a salted hash of the password.
+
+        The cache file is only readable by its owner, and is locked whilst read or written, so that new processes
+        start logging to Trubrics with no auth round-trips, and only a single process refreshes an expired token.
+
+        Args:
+            path: path to the cache file
+        """
+        self.path = os.path.expanduser(path)
+        self._entries: Dict[str, dict] = {}
+        # passwords already checked against the cache file by this process
+        self._passwords: Dict[str, str] = {}
+
+    @contextmanager
+    def _locked(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd = os.open(self.path + ".lock", os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            with open(self.path) as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write(self, entries: Dict[str, dict]):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_CREAT | os.O_WRONLY | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as file:
+            json.dump(entries, file)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _key(firebase_api_key: str, email: str) -> str:
+        return f"{firebase_api_key}:{email}"
+
+    @staticmethod
+    def _is_valid(entry: Optional[dict]) -> bool:
+        return entry is not None and entry.get("expiresAt", 0) > time.time() + EXPIRY_MARGIN_SECONDS
+
+    @staticmethod
+    def _matches_password(entry: Optional[dict], password: str) -> bool:
+        if entry is None or "passwordHash" not in entry:
+            return False
+        return hmac.compare_digest(
+            entry["passwordHash"], _hash_password(password, bytes.fromhex(entry["passwordSalt"]))
+        )
+
+    def get_auth(self, firebase_api_key: str, email: str, password: str) -> Dict[str, str]:
+        """
+        Get a valid auth token, from memory, from the cache file, by refreshing the cached token, or finally by
+        signing in with a password.
+        """
+        key = self._key(firebase_api_key, email)
+        entry = self._entries.get(key)
+        password_checked = key in self._passwords and hmac.compare_digest(self._passwords[key], password)
+        if password_checked and self._is_valid(entry):
+            return entry  # type: ignore
+        with self._locked():
+            entries = self._read()
+            entry = entries.get(key)
+            if not (password_checked or self._matches_password(entry, password)):
+                # tokens cached for another password are not used, nor refreshed
+                entry = None
+            if not self._is_valid(entry):
+                auth = {"error": "No cached refresh token."}
+                if entry is not None and "refreshToken" in entry:
+                    auth = refresh_trubrics_auth_token(firebase_api_key, entry["refreshToken"])
+                if "error" in auth:
+                    auth = get_trubrics_auth_token.__wrapped__(firebase_api_key, email, password)
+                if "error" in auth:
+                    return auth
+                if entry is None:
+                    salt = os.urandom(16)
+                    entry = {
+                        **entries.get(key, {}),
+                        "passwordSalt": salt.hex(),
+                        "passwordHash": _hash_password(password, salt),
+                    }
+                entry = {**entry, **auth, "expiresAt": time.time() + int(auth["expiresIn"])}
+                entries[key] = entry
+                self._write(entries)
+                logger.debug(f"Trubrics auth token for {email} saved to {self.path}.")
+        self._entries[key] = entry  # type: ignore
+        self._passwords[key] = password
+        return entry  # type: ignore
+
+    def get(self, firebase_api_key: str, email: str, field: str):
+        """Get a cached field of an account, such as "firestore_api_url" or "projects"."""
+        entry = self._entries.get(self._key(firebase_api_key, email))
+        if entry is None:
+            with self._locked():
+                entry = self._read().get(self._key(firebase_api_key, email), {})
+        return entry.get(field)
+
+    def set(self, firebase_api_key: str, email: str, **fields):
+        """Save fields of an account, such as "firestore_api_url" or "projects", to the cache."""
+        key = self._key(firebase_api_key, email)
+        with self._locked():
+            entries = self._read()
+            entries[key] = {**entries.get(key, {}), **fields}
+            self._write(entries)
+        self._entries[key] = entries[key]
@@ -0,0 +1,5 @@
+from trubrics.platform.backends.base import DocumentWrite, StorageBackend
+from trubrics.platform.backends.firestore import FirestoreBackend
+from trubrics.platform.backends.sqlite import SQLiteBackend
+
+__all__ = ["DocumentWrite", "StorageBackend", "FirestoreBackend", "SQLiteBackend"]
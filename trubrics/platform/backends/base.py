@@ -0,0 +1,78 @@
+from abc import ABC, abstractmethod
+from typing import List, NamedTuple, Optional, Tuple
+
+
+class DocumentWrite(NamedTuple):
+    """A write of a document to a collection, that creates the document or, if `upsert`, merges its fields."""
+
+    project: str
+    collection: str
+    document_id: str
+    document: dict
+    upsert: bool = False
+
+
+class StorageBackend(ABC):
+    """
+    The storage of prompts, feedback & sessions. Documents are python dicts, saved to collections (e.g. "prompts" or
+    "feedback/{component}/responses") of a project, with a client side document id.
+    """
+
+    #: the maximum number of writes per commit
+    batch_size: int = 500
+
+    @abstractmethod
+    def list_projects(self) -> List[str]:
+        """List the names of all projects."""
+        ...
+
+    @abstractmethod
+    def list_components(self, project: str) -> List[str]:
+        """List the names of all feedback components of a project."""
+        ...
+
+    @abstractmethod
+    def save_document(self, project: str, collection: str, document_id: str, document: dict) -> dict:
+        """
+        Save a document, with a dict response containing the "doc_id", or an "error". Saving a document with the same
+        id again is a no-op.
+        """
+        ...
+
+    @abstractmethod
+    def upsert_document(self, project: str, collection: str, document_id: str, document: dict) -> dict:
+        """
+        Create a document, or update the fields of an existing document, with a dict response containing the
+        "doc_id", or an "error". Fields of an existing document that are not in `document` are kept, as are its
+        create only fields, such as `created_on`.
+        """
+        ...
+
+    @abstractmethod
+    def commit(self, writes: List[DocumentWrite]) -> dict:
+        """
+        Apply a list of writes, with a dict response containing an "error" if any write failed. Writes may not be
+        applied atomically, and creating a document that already exists is a no-op, as with `save_document`.
+        """
+        ...
+
+    @abstractmethod
+    def list_documents(
+        self, project: str, collection: str, page_size: int = 300, page_token: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        List a page of documents in a collection, ordered by document id.
+
+        Returns:
+            the documents (with their id in the "id" field), and the token of the next page, or None on the last page
+        """
+        ...
+
+    def _before_fork(self):
+        pass
+
+    def _after_fork_in_child(self):
+        pass
+
+    def close(self):
+        pass
@@ -0,0 +1,120 @@
+from typing import List, Optional, Tuple
+
+from pydantic import SecretStr
+
+from trubrics.platform.auth import expire_after_n_seconds, get_trubrics_auth_token
+from trubrics.platform.auth_cache import AuthCache
+from trubrics.platform.backends.base import DocumentWrite, StorageBackend
+from trubrics.platform.firestore import (
+    create_document_write,
+    firestore_document_to_dict,
+    list_components_in_organisation,
+    list_documents_in_collection,
+    list_projects_in_organisation,
+    merge_document_write,
+    save_document_to_collection,
+    upsert_document_in_collection,
+)
+from trubrics.platform.scheduler import WriteScheduler
+
+
+class FirestoreBackend(StorageBackend):
+    def __init__(
+        self,
+        firebase_api_key: str,
+        email: str,
+        password: str,
+        firestore_api_url: str,
+        auth_cache: Optional[AuthCache] = None,
+    ):
+        """
+        The hosted Trubrics storage, with the Firestore REST API. Commits are shaped by an adaptive `WriteScheduler`,
+        whereas single documents (`save_document` / `upsert_document`) are saved immediately.
+
+        Args:
+            firebase_api_key: the API key of the Trubrics firebase project
+            email: the email of a Trubrics account
+            password: the password of a Trubrics account
+            firestore_api_url: the url of the organisation of the account, with `get_trubrics_firestore_api_url`
+            auth_cache: an optional file backed cache of auth tokens, shared by all processes on a host
+        """
+        self.firebase_api_key = firebase_api_key
+        self.email = email
+        self.password = SecretStr(password)
+        self.firestore_api_url = firestore_api_url
+        self.auth_cache = auth_cache
+        self.scheduler = WriteScheduler(backend=self)
+
+    @property
+    def batch_size(self) -> int:  # type: ignore
+        return self.scheduler.batch_size
+
+    def _after_fork_in_child(self):
+        self.scheduler._after_fork_in_child()
+
+    def get_auth(self) -> dict:
+        """Get a valid auth token of the account."""
+        if self.auth_cache is not None:
+            return self.auth_cache.get_auth(self.firebase_api_key, self.email, self.password.get_secret_value())
+        return get_trubrics_auth_token(
+            self.firebase_api_key, self.email, self.password.get_secret_value(), rerun=expire_after_n_seconds()
+        )
+
+    def list_projects(self) -> List[str]:
+        projects = list_projects_in_organisation(self.firestore_api_url, self.get_auth())
+        if self.auth_cache is not None:
+            self.auth_cache.set(self.firebase_api_key, self.email, projects=projects)
+        return projects
+
+    def list_components(self, project: str) -> List[str]:
+        return list_components_in_organisation(
+            firestore_api_url=self.firestore_api_url, auth=self.get_auth(), project=project
+        )
+
+    def save_document(self, project: str, collection: str, document_id: str, document: dict) -> dict:
+        return save_document_to_collection(
+            self.get_auth(),
+            firestore_api_url=self.firestore_api_url,
+            project=project,
+            collection=collection,
+            document=document,
+            document_id=document_id,
+        )
+
+    def upsert_document(self, project: str, collection: str, document_id: str, document: dict) -> dict:
+        return upsert_document_in_collection(
+            self.get_auth(),
+            firestore_api_url=self.firestore_api_url,
+            project=project,
+            collection=collection,
+            document_id=document_id,
+            document=document,
+        )
+
+    def commit(self, writes: List[DocumentWrite]) -> dict:
+        return self.scheduler.commit(
+            [
+                (merge_document_write if write.upsert else create_document_write)(
+                    self.firestore_api_url,
+                    project=write.project,
+                    collection=write.collection,
+                    document_id=write.document_id,
+                    document_dict=write.document,
+                )
+                for write in writes
+            ]
+        )
+
+    def list_documents(
+        self, project: str, collection: str, page_size: int = 300, page_token: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        res = list_documents_in_collection(
+            self.get_auth(),
+            firestore_api_url=self.firestore_api_url,
+            project=project,
+            collection=collection,
+            page_size=page_size,
+            page_token=page_token,
+        )
+        documents = [firestore_document_to_dict(document) for document in res.get("documents", [])]
+        return documents, res.get("nextPageToken")
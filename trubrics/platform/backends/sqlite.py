@@ -0,0 +1,209 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from trubrics.platform.backends.base import DocumentWrite, StorageBackend
+from trubrics.platform.firestore import (
+    CREATE_ONLY_FIELDS,
+    dict_to_firestore_document,
+    firestore_fields_to_dict,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    project TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    id TEXT NOT NULL,
+    created_on TEXT,
+    session_id TEXT,
+    prompt_id TEXT,
+    fields TEXT NOT NULL,
+    synced INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (project, collection, id)
+);
+CREATE INDEX IF NOT EXISTS documents_created_on ON documents (project, collection, created_on);
+CREATE INDEX IF NOT EXISTS documents_session_id ON documents (session_id) WHERE session_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS documents_prompt_id ON documents (prompt_id) WHERE prompt_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS documents_not_synced ON documents (synced) WHERE synced = 0;
+CREATE TABLE IF NOT EXISTS components (
+    project TEXT NOT NULL,
+    component TEXT NOT NULL,
+    PRIMARY KEY (project, component)
+);
+"""
+
+_INSERT = (
+    "INSERT {} INTO documents (project, collection, id, created_on, session_id, prompt_id, fields) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+class SQLiteBackend(StorageBackend):
+    batch_size = 10_000
+
+    def __init__(self, path: str, components: Iterable[Tuple[str, str]] = (("default", "default"),)):
+        """
+        An embedded local storage, with a SQLite database in WAL mode. Writes are committed at local disk speed, with
+        all writes of a commit (e.g. from the background writer) inserted in a single transaction.
+
+        Documents are saved in the Firestore REST encoding, so that they are decoded exactly as hosted documents, and
+        may be synced to Trubrics later with `sync()`.
+
+        Args:
+            path: the path of the SQLite database, created if it does not exist
+            components: (project, component) pairs of the feedback components to create. Projects are the projects of
+                all components.
+        """
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        with self._connection() as connection:
+            connection.executemany("INSERT OR IGNORE INTO components VALUES (?, ?)", components)
+
+    def _connection(self) -> sqlite3.Connection:
+        # one connection per thread (and per process), as sqlite connections may not be shared
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            connection.isolation_level = "DEFERRED"
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _after_fork_in_child(self):
+        # connections of the parent must not be used (or closed) by children
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def close(self):
+        """Close the connections of all threads. Connections are reopened by the next read or write."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for connection in connections:
+            connection.close()
+
+    @staticmethod
+    def _row(project: str, collection: str, document_id: str, document: dict) -> tuple:
+        created_on = document.get("created_on")
+        return (
+            project,
+            collection,
+            document_id,
+            created_on.isoformat() if isinstance(created_on, datetime) else created_on,
+            document.get("session_id"),
+            document.get("prompt_id"),
+            json.dumps(dict_to_firestore_document(document)["fields"]),
+        )
+
+    def _upsert(self, connection: sqlite3.Connection, project: str, collection: str, document_id: str, document: dict):
+        existing = connection.execute(
+            "SELECT fields FROM documents WHERE project = ? AND collection = ? AND id = ?",
+            (project, collection, document_id),
+        ).fetchone()
+        if existing is not None:
+            existing_document = firestore_fields_to_dict(json.loads(existing[0]))
+            create_only_fields = {
+                field: existing_document[field] for field in CREATE_ONLY_FIELDS if field in existing_document
+            }
+            document = {**existing_document, **document, **create_only_fields}
+        connection.execute(_INSERT.format("OR REPLACE"), self._row(project, collection, document_id, document))
+
+    def list_projects(self) -> List[str]:
+        return [row[0] for row in self._connection().execute("SELECT DISTINCT project FROM components")]
+
+    def list_components(self, project: str) -> List[str]:
+        rows = self._connection().execute("SELECT component FROM components WHERE project = ?", (project,))
+        return [row[0] for row in rows]
+
+    def save_document(self, project: str, collection: str, document_id: str, document: dict) -> dict:
+        document = {key: value for key, value in document.items() if key != "id"}
+        try:
+            with self._connection() as connection:
+                connection.execute(_INSERT.format("OR IGNORE"), self._row(project, collection, document_id, document))
+        except sqlite3.Error as err:
+            return {"error": str(err)}
+        return {"doc_id": document_id}
+
+    def upsert_document(self, project: str, collection: str, document_id: str, document: dict) -> dict:
+        document = {key: value for key, value in document.items() if key != "id"}
+        try:
+            with self._connection() as connection:
+                self._upsert(connection, project, collection, document_id, document)
+        except sqlite3.Error as err:
+            return {"error": str(err)}
+        return {"doc_id": document_id}
+
+    def commit(self, writes: List[DocumentWrite]) -> dict:
+        try:
+            with self._connection() as connection:
+                connection.executemany(
+                    _INSERT.format("OR IGNORE"),
+                    [
+                        self._row(write.project, write.collection, write.document_id, write.document)
+                        for write in writes
+                        if not write.upsert
+                    ],
+                )
+                for write in writes:
+                    if write.upsert:
+                        self._upsert(connection, write.project, write.collection, write.document_id, write.document)
+        except sqlite3.Error as err:
+            return {"error": str(err)}
+        return {}
+
+    def list_documents(
+        self, project: str, collection: str, page_size: int = 300, page_token: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        rows = self._connection().execute(
+            "SELECT id, fields FROM documents WHERE project = ? AND collection = ? AND id > ? ORDER BY id LIMIT ?",
+            (project, collection, page_token or "", page_size),
+        )
+        documents = [
+            {**firestore_fields_to_dict(json.loads(fields)), "id": document_id} for document_id, fields in rows
+        ]
+        next_page_token = documents[-1]["id"] if len(documents) == page_size else None
+        return documents, next_page_token
+
+    def sync(self, backend: StorageBackend, batch_size: int = 500) -> int:
+        """
+        Copy all documents that have not yet been synced to another backend, such as the `FirestoreBackend` of a
+        Trubrics client (`trubrics.backend`). Documents are merged into the other backend, so syncing is idempotent.
+
+        Returns:
+            the number of synced documents
+        """
+        n_synced = 0
+        while True:
+            rows = (
+                self._connection()
+                .execute(
+                    "SELECT project, collection, id, fields FROM documents WHERE synced = 0 ORDER BY rowid LIMIT ?",
+                    (min(batch_size, backend.batch_size),),
+                )
+                .fetchall()
+            )
+            if not rows:
+                return n_synced
+            writes = [
+                DocumentWrite(project, collection, document_id, firestore_fields_to_dict(json.loads(fields)), True)
+                for project, collection, document_id, fields in rows
+            ]
+            res = backend.commit(writes)
+            if "error" in res:
+                raise Exception(f"Error syncing documents: {res['error']}")
+            with self._connection() as connection:
+                # documents updated whilst syncing are only marked as synced if unchanged
+                connection.executemany(
+                    "UPDATE documents SET synced = 1 WHERE project = ? AND collection = ? AND id = ? AND fields = ?",
+                    rows,
+                )
+            n_synced += len(rows)
@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 
 from pydantic import BaseModel, SecretStr
 
@@ -12,12 +13,13 @@ class TrubricsDefaults(BaseModel):
 
 
 class TrubricsConfig(BaseModel):
-    email: str
-    password: SecretStr
     project: str
-    username: str
-    firebase_api_key: str
-    firestore_api_url: str
+    # account fields, that are not set for clients with a local storage backend
+    email: Optional[str] = None
+    password: Optional[SecretStr] = None
+    username: Optional[str] = None
+    firebase_api_key: Optional[str] = None
+    firestore_api_url: Optional[str] = None
 
     class Config:
         json_encoders = {SecretStr: lambda v: v.get_secret_value() if v else None}
@@ -0,0 +1,92 @@
+"""
+Debounced feedback upserts, merging the interactions of a user with a feedback component into a single write.
+"""
+import atexit
+import threading
+import weakref
+from typing import TYPE_CHECKING, Dict, Tuple
+
+from loguru import logger
+
+from trubrics.platform.feedback import Feedback
+
+if TYPE_CHECKING:
+    from trubrics.platform import Trubrics
+
+
+class FeedbackDebouncer:
+    def __init__(self, client: "Trubrics"):
+        """
+        Hold feedback upserts for a time window, merging all feedback with the same id that is logged within the window
+        into a single PATCH request. The window is restarted by each new interaction, and all pending feedback is sent
+        at exit.
+
+        Args:
+            client: an authenticated Trubrics client
+        """
+        self.client = client
+        self._reset()
+        _debouncers.add(self)
+
+    def _reset(self):
+        """Drop all pending feedback, timers & the lock, for example in a forked child process."""
+        self._pending: Dict[Tuple[str, str], Feedback] = {}
+        self._timers: Dict[Tuple[str, str], threading.Timer] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, project: str, feedback: Feedback, window: float):
+        """Queue a feedback upsert, sent once no feedback with the same id has been logged for `window` seconds."""
+        if feedback.id is None:
+            raise ValueError("A feedback id is required to merge feedback upserts.")
+        key = (project, feedback.id)
+        with self._lock:
+            previous = self._pending.get(key)
+            if previous is not None:
+                # the first interaction gives the created time, metadata of all interactions is kept
+                feedback.created_on = previous.created_on
+                feedback.metadata = {**previous.metadata, **feedback.metadata}
+                self._timers.pop(key).cancel()
+            self._pending[key] = feedback
+            timer = threading.Timer(window, self._send, args=(key,))
+            timer.daemon = True
+            self._timers[key] = timer
+            timer.start()
+
+    def flush(self):
+        """Send all pending feedback now."""
+        with self._lock:
+            keys = list(self._pending)
+            for key in keys:
+                self._timers.pop(key).cancel()
+        for key in keys:
+            self._send(key)
+
+    def _send(self, key: Tuple[str, str]):
+        with self._lock:
+            feedback = self._pending.pop(key, None)
+            self._timers.pop(key, None)
+        if feedback is None:
+            return
+        project, feedback_id = key
+        res = self.client.backend.upsert_document(
+            project,
+            collection=f"feedback/{feedback.component}/responses",
+            document_id=feedback_id,
+            document=feedback.dict(),
+        )
+        if "error" in res:
+            logger.error(res["error"])
+        else:
+            logger.info("User feedback saved to Trubrics.")
+
+
+# debouncers are weakly referenced, so that their clients may be garbage collected before exit
+_debouncers: "weakref.WeakSet[FeedbackDebouncer]" = weakref.WeakSet()
+
+
+def _flush_at_exit():
+    for debouncer in list(_debouncers):
+        debouncer.flush()
+
+
+atexit.register(_flush_at_exit)
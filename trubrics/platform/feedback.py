@@ -15,6 +15,7 @@ class Feedback(BaseModel):
     The Feedback object represents all data contained as a feedback response from a user.
 
     Attributes:
+        id: feedback id
         component: the name of the component that the feedback response is saved to
         model: the model name / version
         user_response: the user response, with a type, score and text
@@ -25,6 +26,7 @@ class Feedback(BaseModel):
         metadata: optional metadata, such as model prompts & predictions
     """
 
+    id: Optional[str] = None
     component: str
     model: str
     user_response: Response
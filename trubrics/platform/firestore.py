@@ -1,77 +1,306 @@
 """
 File of HTTP requests to Firestore Rest API.
 """
+import array
+import ast
+import base64
 import json
+import secrets
+import string
+import struct
+import sys
 from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import quote
 
-import requests  # type: ignore
+from trubrics.platform.transport import get_transport
+
+DOCUMENT_ID_ALPHABET = string.ascii_letters + string.digits
+
+
+def generate_document_id(length=20):
+    """Generate a random document id, in the same format as Firestore auto ids.
+
+    Random ids (rather than time ordered ids) spread writes across the index keyspace, avoiding hot-spots.
+    """
+    return "".join(secrets.choice(DOCUMENT_ID_ALPHABET) for _ in range(length))
+
+
+ARRAY_MAGIC = b"\x93NUMPY"
+
+_ARRAY_TYPECODE_KINDS = {"f": "f", "d": "f"}
+
+
+def _is_numpy_array(value) -> bool:
+    return type(value).__module__ == "numpy" and type(value).__name__ == "ndarray"
+
+
+def _encode_array_header(descr: str, shape: tuple) -> bytes:
+    # a .npy (v1.0) header, so that arrays may also be read with `numpy.load`. Data starts 64 byte aligned.
+    header = repr({"descr": descr, "fortran_order": False, "shape": shape}).encode("latin1")
+    padding = 64 - (len(ARRAY_MAGIC) + 4 + len(header) + 1) % 64
+    header += b" " * (padding % 64) + b"\n"
+    return ARRAY_MAGIC + b"\x01\x00" + struct.pack("<H", len(header)) + header
+
+
+def encode_array(value) -> Optional[bytes]:
+    """Encode a numeric NumPy array or `array.array` to little-endian bytes, with a dtype & shape header.
+
+    Returns None for arrays of other types (e.g. strings or objects), that are encoded as lists instead.
+    """
+    if isinstance(value, array.array):
+        if value.typecode == "u":
+            return None
+        kind = _ARRAY_TYPECODE_KINDS.get(value.typecode, "u" if value.typecode.isupper() else "i")
+        if sys.byteorder == "big":
+            value = array.array(value.typecode, value)
+            value.byteswap()
+        return _encode_array_header(f"<{kind}{value.itemsize}", (len(value),)) + value.tobytes()
+    if value.dtype.kind not in "biufc":
+        return None
+    little_endian = value.astype(value.dtype.newbyteorder("<"), copy=False)
+    return _encode_array_header(little_endian.dtype.str, tuple(value.shape)) + little_endian.tobytes(order="C")
+
+
+def decode_array(value: bytes):
+    """Decode the bytes of an encoded array to a read-only NumPy array, without copying the data.
+
+    Other bytes, or any bytes if NumPy is not installed, are returned unchanged.
+    """
+    if not value.startswith(ARRAY_MAGIC):
+        return value
+    try:
+        import numpy as np
+    except ImportError:
+        return value
+    (header_length,) = struct.unpack("<H", value[8:10])
+    data_offset = 10 + header_length
+    header = ast.literal_eval(value[10:data_offset].decode("latin1"))
+    return np.frombuffer(value, dtype=np.dtype(header["descr"]), offset=data_offset).reshape(header["shape"])
+
+
+def _to_firestore_value(value) -> Optional[dict]:
+    if value is None:
+        return {"nullValue": value}
+    elif isinstance(value, str):
+        return {"stringValue": value}
+    elif isinstance(value, bool):
+        return {"booleanValue": value}
+    elif isinstance(value, int):
+        return {"integerValue": value}
+    elif isinstance(value, float):
+        return {"doubleValue": value}
+    elif isinstance(value, datetime):
+        return {"timestampValue": value.isoformat() + "Z"}
+    elif isinstance(value, dict):
+        return {"mapValue": dict_to_firestore_document(value)}
+    elif isinstance(value, (list, tuple)):
+        # nested arrays are not supported by Firestore
+        array_values = (_to_firestore_value(item) for item in value if not isinstance(item, (list, tuple)))
+        return {"arrayValue": {"values": [item for item in array_values if item is not None]}}
+    elif isinstance(value, array.array) or _is_numpy_array(value):
+        encoded = encode_array(value)
+        if encoded is None:
+            return _to_firestore_value(value.tolist())
+        return {"bytesValue": base64.b64encode(encoded).decode("ascii")}
+    elif type(value).__module__ == "numpy" and hasattr(value, "item"):
+        # numpy scalars, such as numpy.float32
+        return _to_firestore_value(value.item())
+    return None
 
 
 def dict_to_firestore_document(python_dict):
     firestore_compatible = {"fields": {}}
     for key, value in python_dict.items():
-        if value is None:
-            firestore_compatible["fields"][key] = {"nullValue": value}
-        elif isinstance(value, str):
-            firestore_compatible["fields"][key] = {"stringValue": value}
-        elif isinstance(value, bool):
-            firestore_compatible["fields"][key] = {"booleanValue": value}
-        elif isinstance(value, int):
-            firestore_compatible["fields"][key] = {"integerValue": value}
-        elif isinstance(value, float):
-            firestore_compatible["fields"][key] = {"doubleValue": value}
-        elif isinstance(value, datetime):
-            firestore_compatible["fields"][key] = {"timestampValue": value.isoformat() + "Z"}
-        elif isinstance(value, dict):
-            firestore_compatible["fields"][key] = {"mapValue": dict_to_firestore_document(value)}
-        elif isinstance(value, list):
-            array_values = []
-            for item in value:
-                if value is None:
-                    array_values.append({"nullValue": item})
-                elif isinstance(item, str):
-                    array_values.append({"stringValue": item})
-                elif isinstance(item, bool):
-                    array_values.append({"booleanValue": item})
-                elif isinstance(item, int):
-                    array_values.append({"integerValue": item})
-                elif isinstance(item, float):
-                    array_values.append({"doubleValue": item})
-                elif isinstance(item, datetime):
-                    array_values.append({"timestampValue": item.isoformat() + "Z"})
-                elif isinstance(item, dict):
-                    array_values.append({"mapValue": dict_to_firestore_document(item)})
-            firestore_compatible["fields"][key] = {"arrayValue": {"values": array_values}}
+        firestore_value = _to_firestore_value(value)
+        if firestore_value is not None:
+            firestore_compatible["fields"][key] = firestore_value
     return firestore_compatible
 
 
-def get_trubrics_firestore_api_url(auth, gcp_project_id):
-    structured_query = {
-        "structuredQuery": {
-            "from": [{"collectionId": "organisations"}],
-            "where": {
-                "fieldFilter": {
-                    "field": {"fieldPath": "users"},
-                    "op": "ARRAY_CONTAINS",
-                    "value": {
-                        "stringValue": auth["email"],
-                    },
-                }
-            },
+def _decode_timestamp(value: str) -> datetime:
+    # Firestore returns RFC 3339 timestamps in UTC with up to nanosecond precision, e.g. 2023-10-24T10:00:00.123456789Z
+    date, _, fraction = value.rstrip("Z").partition(".")
+    if fraction:
+        return datetime.strptime(f"{date}.{fraction[:6]}", "%Y-%m-%dT%H:%M:%S.%f")
+    return datetime.strptime(date, "%Y-%m-%dT%H:%M:%S")
+
+
+_SCALAR_DECODERS: Dict[str, Callable[[Any], Any]] = {
+    "nullValue": lambda value: None,
+    "booleanValue": bool,
+    "integerValue": int,
+    "doubleValue": float,
+    "timestampValue": _decode_timestamp,
+    "bytesValue": lambda value: decode_array(base64.b64decode(value)),
+    "referenceValue": str,
+    "geoPointValue": dict,
+}
+
+
+def firestore_fields_to_dict(fields: dict) -> dict:
+    """Decode the `fields` of a Firestore document into a python dict.
+
+    Nested map & array values are decoded with an explicit stack rather than recursion, so that deeply nested
+    documents are decoded in a single loop.
+    """
+    result: Dict[str, Any] = {}
+    stack: List[tuple] = [(result, key, value) for key, value in fields.items()]
+    while stack:
+        target, key, value = stack.pop()
+        ((kind, raw),) = value.items()
+        if kind == "stringValue":
+            target[key] = raw
+        elif kind == "mapValue":
+            decoded_map: Dict[str, Any] = {}
+            target[key] = decoded_map
+            stack.extend((decoded_map, k, v) for k, v in raw.get("fields", {}).items())
+        elif kind == "arrayValue":
+            values = raw.get("values", [])
+            decoded_array: List[Any] = [None] * len(values)
+            target[key] = decoded_array
+            stack.extend((decoded_array, i, v) for i, v in enumerate(values))
+        else:
+            target[key] = _SCALAR_DECODERS[kind](raw)
+    return result
+
+
+def firestore_document_to_dict(document: dict) -> dict:
+    """Decode a Firestore REST document into a python dict, with the document id saved to the "id" field."""
+    result = firestore_fields_to_dict(document.get("fields", {}))
+    result["id"] = document["name"].split("/")[-1]
+    return result
+
+
+def firestore_document_to_model(document: dict, model):
+    """Decode a Firestore REST document into a pydantic model, such as a `Prompt` or a `Feedback`."""
+    return model(**firestore_document_to_dict(document))
+
+
+def firestore_documents_to_columns(documents: List[dict], fields: Optional[List[str]] = None) -> Dict[str, list]:
+    """Decode a page of Firestore REST documents into columns, with one list of values per field.
+
+    Nested maps are flattened to dotted field paths (e.g. "user_response.score"), and any field missing from a
+    document is filled with None, so that all columns have the same length. The output can be passed directly to
+    `pandas.DataFrame`.
+
+    Args:
+        documents: a list of Firestore REST documents
+        fields: an optional list of dotted field paths to keep. All fields are kept by default.
+    """
+    n_documents = len(documents)
+    columns: Dict[str, list] = {"id": [None] * n_documents}
+    if fields is not None:
+        for field in fields:
+            columns[field] = [None] * n_documents
+    for row, document in enumerate(documents):
+        columns["id"][row] = document["name"].split("/")[-1]
+        stack = [(key, value) for key, value in document.get("fields", {}).items()]
+        while stack:
+            path, value = stack.pop()
+            ((kind, raw),) = value.items()
+            if kind == "mapValue" and (fields is None or path not in columns):
+                stack.extend((f"{path}.{k}", v) for k, v in raw.get("fields", {}).items())
+                continue
+            if path not in columns:
+                if fields is not None:
+                    continue
+                columns[path] = [None] * n_documents
+            if kind == "stringValue":
+                columns[path][row] = raw
+            elif kind in ("arrayValue", "mapValue"):
+                columns[path][row] = firestore_fields_to_dict({path: value})[path]
+            else:
+                columns[path][row] = _SCALAR_DECODERS[kind](raw)
+    return columns
+
+
+MAX_AGGREGATIONS_PER_QUERY = 5
+
+
+def get_firestore_database_url(firestore_api_url):
+    return firestore_api_url.split("/documents/")[0] + "/documents"
+
+
+def field_filter(field_path, op, value):
+    """Build a structured query filter on a (dotted) field path, e.g. `field_filter("model", "EQUAL", "gpt-4")`."""
+    return {
+        "fieldFilter": {
+            "field": {"fieldPath": field_path},
+            "op": op,
+            "value": _to_firestore_value(value),
         }
     }
-    organisation_route = json.loads(
-        requests.post(
-            f"https://firestore.googleapis.com/v1/projects/{gcp_project_id}/databases/(default)/documents:runQuery",
-            headers={"Content-Type": "application/json", "Authorization": f"Bearer {auth['idToken']}"},
-            data=json.dumps(structured_query),
-        ).text
-    )[0]["document"]["name"]
+
+
+def build_structured_query(collection_id, filters=None, **kwargs):
+    """Build a structured query on a collection, with all filters combined with AND.
+
+    Args:
+        collection_id: the id of the queried collection, relative to the parent document of the query
+        filters: an optional list of filters, built with `field_filter`
+        kwargs: any other fields of the structured query, such as "orderBy", "select" or "limit"
+    """
+    structured_query = {"from": [{"collectionId": collection_id}], **kwargs}
+    if filters:
+        if len(filters) == 1:
+            structured_query["where"] = filters[0]
+        else:
+            structured_query["where"] = {"compositeFilter": {"op": "AND", "filters": filters}}
+    return structured_query
+
+
+def run_query(auth, parent_url, structured_query):
+    """Run a structured query on the collections of a parent document (or of the database root)."""
+    r = get_transport().post(
+        parent_url + ":runQuery",
+        headers={"Content-Type": "application/json", "Authorization": f"Bearer {auth['idToken']}"},
+        data=json.dumps({"structuredQuery": structured_query}),
+    )
+    return json.loads(r.text)
+
+
+def run_aggregation_query(auth, parent_url, structured_query, aggregations):
+    """Run COUNT / SUM / AVG aggregations over the results of a structured query, server side.
+
+    Args:
+        auth: auth tokens
+        parent_url: the url of the parent document of the queried collection
+        structured_query: a structured query, built with `build_structured_query`
+        aggregations: a list of aggregations, e.g. `[{"alias": "n", "count": {}}]`
+
+    Returns:
+        a dict of the aggregated values per alias, or a dict with an "error" key
+    """
+    r = get_transport().post(
+        parent_url + ":runAggregationQuery",
+        headers={"Content-Type": "application/json", "Authorization": f"Bearer {auth['idToken']}"},
+        data=json.dumps(
+            {"structuredAggregationQuery": {"structuredQuery": structured_query, "aggregations": aggregations}}
+        ),
+    )
+    res = json.loads(r.text)
+    if isinstance(res, dict):
+        return res
+    if "error" in res[0]:
+        return res[0]
+    return firestore_fields_to_dict(res[0]["result"]["aggregateFields"])
+
+
+def get_trubrics_firestore_api_url(auth, gcp_project_id):
+    res = run_query(
+        auth,
+        parent_url=f"https://firestore.googleapis.com/v1/projects/{gcp_project_id}/databases/(default)/documents",
+        structured_query=build_structured_query(
+            "organisations", filters=[field_filter("users", "ARRAY_CONTAINS", auth["email"])]
+        ),
+    )
+    organisation_route = res[0]["document"]["name"]
     return f"https://firestore.googleapis.com/v1/{organisation_route}"
 
 
 def list_projects_in_organisation(firestore_api_url, auth):
-    r = requests.get(
+    r = get_transport().get(
         firestore_api_url + "/projects" + "?pageSize=50",
         headers={"Content-Type": "application/json", "Authorization": f"Bearer {auth['idToken']}"},
     )
@@ -87,7 +316,7 @@ def list_projects_in_organisation(firestore_api_url, auth):
 
 
 def list_components_in_organisation(firestore_api_url, auth, project):
-    r = requests.get(
+    r = get_transport().get(
         firestore_api_url + f"/projects/{project}/feedback" + "?pageSize=50",
         headers={"Content-Type": "application/json", "Authorization": f"Bearer {auth['idToken']}"},
     )
@@ -102,19 +331,134 @@ def list_components_in_organisation(firestore_api_url, auth, project):
     return all_components
 
 
-def save_document_to_collection(auth, firestore_api_url, project, collection, document):
+def list_documents_in_collection(auth, firestore_api_url, project, collection, page_size=300, page_token=None):
+    """List a page of raw documents in a collection. Decode them with `firestore_document_to_dict`,
+    `firestore_document_to_model` or `firestore_documents_to_columns`."""
+    url = firestore_api_url + f"/projects/{project}/{collection}?pageSize={page_size}"
+    if page_token is not None:
+        url += f"&pageToken={quote(page_token, safe='')}"
+    r = get_transport().get(
+        url,
+        headers={"Content-Type": "application/json", "Authorization": f"Bearer {auth['idToken']}"},
+    )
+    r.raise_for_status()
+    return json.loads(r.text)
+
+
+def save_document_to_collection(auth, firestore_api_url, project, collection, document, document_id=None):
+    """Save a document to a collection. If a `document_id` is given, saving the same document again is a no-op."""
     url = firestore_api_url + f"/projects/{project}/{collection}"
-    document_dict = document.dict()
+    if document_id is not None:
+        url += f"?documentId={quote(document_id, safe='')}"
+    document_dict = dict(document) if isinstance(document, dict) else document.dict()
     if "id" in document_dict.keys():
         document_dict.pop("id")
-    res = json.loads(
-        requests.post(
-            url,
-            headers={"Content-Type": "application/json", "Authorization": f"Bearer {auth['idToken']}"},
-            data=json.dumps(dict_to_firestore_document(document_dict)),
-        ).text
+    r = get_transport().post(
+        url,
+        headers={"Content-Type": "application/json", "Authorization": f"Bearer {auth['idToken']}"},
+        data=json.dumps(dict_to_firestore_document(document_dict)),
     )
+    res = json.loads(r.text)
 
+    if document_id is not None and res.get("error", {}).get("status") == "ALREADY_EXISTS":
+        # the document was saved by a previous attempt
+        res = {"name": get_firestore_document_name(firestore_api_url, project, collection, document_id)}
     if "name" in res:
         res["doc_id"] = res["name"].split("/")[-1]
     return res
+
+
+# fields that are only written when a document is created, and kept by upserts
+CREATE_ONLY_FIELDS = ("created_on",)
+
+
+def upsert_document_in_collection(auth, firestore_api_url, project, collection, document_id, document):
+    """Create a document, or update the fields of an existing document, with a PATCH request.
+
+    Only the fields of `document` are written (with an `updateMask`), other fields of an existing document are kept.
+    Create only fields, such as `created_on`, are only written when the document is created: documents that do not
+    exist yet are created with a second request.
+    """
+    document_dict = dict(document) if isinstance(document, dict) else document.dict()
+    if "id" in document_dict.keys():
+        document_dict.pop("id")
+    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {auth['idToken']}"}
+    data = json.dumps(dict_to_firestore_document(document_dict))
+    update_mask = "&".join(
+        f"updateMask.fieldPaths={field}" for field in document_dict.keys() if field not in CREATE_ONLY_FIELDS
+    )
+    update_url = (
+        firestore_api_url
+        + f"/projects/{project}/{collection}/{quote(document_id, safe='')}?{update_mask}&currentDocument.exists=true"
+    )
+    res = json.loads(get_transport().patch(update_url, headers=headers, data=data).text)
+    if res.get("error", {}).get("status") == "NOT_FOUND":
+        create_url = firestore_api_url + f"/projects/{project}/{collection}?documentId={quote(document_id, safe='')}"
+        res = json.loads(get_transport().post(create_url, headers=headers, data=data).text)
+        if res.get("error", {}).get("status") == "ALREADY_EXISTS":
+            # the document was created concurrently, since the update
+            res = json.loads(get_transport().patch(update_url, headers=headers, data=data).text)
+    if "name" in res:
+        res["doc_id"] = res["name"].split("/")[-1]
+    return res
+
+
+MAX_WRITES_PER_COMMIT = 500
+
+# google.rpc.Code of the write statuses of batchWrite responses
+OK = 0
+NOT_FOUND = 5
+ALREADY_EXISTS = 6
+
+
+def get_firestore_document_name(firestore_api_url, project, collection, document_id):
+    organisation_route = firestore_api_url.split("/v1/")[-1]
+    return f"{organisation_route}/projects/{project}/{collection}/{document_id}"
+
+
+def create_document_write(firestore_api_url, project, collection, document_id, document_dict):
+    """Build a write that creates a document, failing with ALREADY_EXISTS if it already exists."""
+    return {
+        "update": {
+            "name": get_firestore_document_name(firestore_api_url, project, collection, document_id),
+            **dict_to_firestore_document(document_dict),
+        },
+        "currentDocument": {"exists": False},
+    }
+
+
+def merge_document_write(firestore_api_url, project, collection, document_id, document_dict):
+    """
+    Build a write that overwrites only the fields in `document_dict` of an existing document, except its create only
+    fields. The write fails with NOT_FOUND if the document does not exist, to be retried with `create_write_of`.
+    """
+    return {
+        "update": {
+            "name": get_firestore_document_name(firestore_api_url, project, collection, document_id),
+            **dict_to_firestore_document(document_dict),
+        },
+        "updateMask": {"fieldPaths": [field for field in document_dict.keys() if field not in CREATE_ONLY_FIELDS]},
+        "currentDocument": {"exists": True},
+    }
+
+
+def create_write_of(write):
+    """Build a write that creates the document of a merge write, with all of its fields."""
+    return {"update": write["update"], "currentDocument": {"exists": False}}
+
+
+def batch_write(auth, firestore_api_url, writes):
+    """
+    Apply a list of writes in a single Firestore batchWrite request. Writes are applied independently rather than
+    atomically, with a status per write, and at most one write per document is allowed.
+    """
+    r = get_transport().post(
+        get_firestore_database_url(firestore_api_url) + ":batchWrite",
+        headers={"Content-Type": "application/json", "Authorization": f"Bearer {auth['idToken']}"},
+        data=json.dumps({"writes": writes}),
+    )
+    try:
+        return json.loads(r.text)
+    except json.JSONDecodeError:
+        # e.g. an html error page of a proxy or load balancer
+        return {"error": {"code": r.status_code, "message": r.text}}
@@ -0,0 +1,53 @@
+"""
+Fork safety for preforking servers (e.g. gunicorn --preload).
+
+Before a fork, registered objects flush their pending data in the parent process, so that nothing is sent twice. After
+a fork, registered objects drop their threads, locks & connections in the child process, to be rebuilt lazily.
+"""
+import os
+import threading
+import weakref
+from typing import Callable
+
+from loguru import logger
+
+# the maximum number of seconds that a fork waits for pending data to be flushed
+FORK_FLUSH_TIMEOUT = 10.0
+
+_registered: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def register_at_fork(obj):
+    """Register an object implementing `_before_fork()` and `_after_fork_in_child()` methods."""
+    _registered.add(obj)
+
+
+def flush_before_fork(flush: Callable[[], None]):
+    """
+    Call `flush` before a fork, waiting at most `FORK_FLUSH_TIMEOUT` seconds, so that a slow or unreachable backend
+    does not block the fork. Data that is still being flushed after the timeout is saved by the parent process only.
+    """
+    thread = threading.Thread(target=flush, name="trubrics-fork-flush", daemon=True)
+    thread.start()
+    thread.join(FORK_FLUSH_TIMEOUT)
+    if thread.is_alive():
+        logger.warning(
+            f"Trubrics data was not flushed within {FORK_FLUSH_TIMEOUT}s before fork, flushing it after fork."
+        )
+
+
+def _before_fork():
+    for obj in list(_registered):
+        try:
+            obj._before_fork()
+        except Exception as err:
+            logger.error(f"Error flushing Trubrics data before fork: {str(err)}.")
+
+
+def _after_fork_in_child():
+    for obj in list(_registered):
+        obj._after_fork_in_child()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(before=_before_fork, after_in_child=_after_fork_in_child)
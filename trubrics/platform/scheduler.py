@@ -0,0 +1,238 @@
+"""
+Adaptive write scheduling, shaping bulk commits to the write rates that Firestore can sustain.
+
+Firestore recommends starting new collections at 500 writes per second, and increasing traffic by 50% every 5 minutes
+(the 500/50/5 rule). Collections with sequentially indexed fields, such as `created_on`, are also limited in their
+write rate. Exceeding these limits returns RESOURCE_EXHAUSTED errors.
+
+Only bulk commits (from background writers, sessions and `flush()`) are shaped. Single documents saved synchronously,
+with `log_prompt` / `log_feedback` without `background=True`, are sent immediately in the request of the caller.
+"""
+import random
+import threading
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, List
+
+from loguru import logger
+
+from trubrics.platform.firestore import (
+    ALREADY_EXISTS,
+    MAX_WRITES_PER_COMMIT,
+    NOT_FOUND,
+    OK,
+    batch_write,
+    create_write_of,
+)
+from trubrics.platform.transport import TransportError
+
+if TYPE_CHECKING:
+    from trubrics.platform.backends import FirestoreBackend
+
+THROTTLING_STATUSES = ("RESOURCE_EXHAUSTED", "UNAVAILABLE", "ABORTED", "FAILED_PRECONDITION")
+# the google.rpc.Code of the throttling statuses, in the write statuses of batchWrite responses
+THROTTLING_CODES = (8, 14, 10, 9)
+# the http status codes of throttled requests, whose body may not be a Firestore error (e.g. from a proxy)
+THROTTLING_HTTP_CODES = (429, 503)
+
+
+def get_write_name(write: dict) -> str:
+    """Get the document name of a write."""
+    return write["update"]["name"] if "update" in write else write["delete"]
+
+
+def get_write_collection_group(write: dict) -> str:
+    """
+    Get the collection group of a write, i.e. the id of its collection. All `turns` subcollections of sessions are in
+    the same collection group, and share its indexes & write rate.
+    """
+    return get_write_name(write).rsplit("/", 2)[-2]
+
+
+def split_writes_per_document(writes: List[dict]) -> List[List[dict]]:
+    """
+    Split writes into batches with at most one write per document, as required by batchWrite. The n-th write of a
+    document is in the n-th batch, so that writes of the same document are applied in order.
+    """
+    batches: List[List[dict]] = []
+    n_writes: Counter = Counter()
+    for write in writes:
+        name = get_write_name(write)
+        if n_writes[name] == len(batches):
+            batches.append([])
+        batches[n_writes[name]].append(write)
+        n_writes[name] += 1
+    return batches
+
+
+def is_throttled(res: dict) -> bool:
+    """Whether a Firestore response is a throttling (or contention) error, that may be retried after a backoff."""
+    error = res.get("error")
+    return isinstance(error, dict) and (
+        error.get("code") in THROTTLING_HTTP_CODES or error.get("status") in THROTTLING_STATUSES
+    )
+
+
+class _CollectionRate:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.started = self.updated = time.monotonic()
+
+
+class WriteScheduler:
+    def __init__(
+        self,
+        backend: "FirestoreBackend",
+        initial_rate: float = 500.0,
+        rate_increase: float = 50.0,
+        initial_batch_size: int = 50,
+        batch_size_increase: int = 50,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+    ):
+        """
+        Shape the commits of a Trubrics backend with additive increase / multiplicative decrease (AIMD).
+
+        Each collection group has a write rate, enforced with a token bucket, so that the writes to a hot collection
+        group are spread over time. Rates start at `initial_rate` writes per second, and each successful commit
+        increases the rate of its collection groups by `rate_increase`, up to the 500/50/5 ramp-up of the collection
+        group. Commits are made of up to `batch_size` writes, increased by `batch_size_increase` after each successful
+        commit. A throttled commit (or a connection error) halves the rates of its collection groups and the batch
+        size, and is retried after an exponential backoff.
+
+        Args:
+            backend: the hosted Trubrics backend, authenticated with a Trubrics account
+            initial_rate: the initial write rate of each collection group, in writes per second
+            rate_increase: the write rate increase of a collection group, after each successful commit
+            initial_batch_size: the initial number of writes per commit of the background writer
+            batch_size_increase: the batch size increase after each successful commit
+            max_retries: the number of times a throttled commit is retried
+            backoff: the initial backoff of throttled commits, in seconds
+        """
+        self.backend = backend
+        self.initial_rate = initial_rate
+        self.rate_increase = rate_increase
+        self.batch_size = initial_batch_size
+        self.batch_size_increase = batch_size_increase
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._rates: Dict[str, _CollectionRate] = {}
+        self._lock = threading.Lock()
+
+    def _after_fork_in_child(self):
+        # rates are kept, as they reflect the limits of the collections rather than of the process
+        self._lock = threading.Lock()
+
+    def get_rate(self, collection_group: str) -> float:
+        """Get the current write rate of a collection group (e.g. "turns"), in writes per second."""
+        with self._lock:
+            state = self._rates.get(collection_group)
+            return self.initial_rate if state is None else state.rate
+
+    def _ramp_up_limit(self, state: _CollectionRate, now: float) -> float:
+        # 500/50/5: increase by at most 50% every 5 minutes
+        return self.initial_rate * 1.5 ** ((now - state.started) // 300)
+
+    def acquire(self, writes: List[dict]):
+        """Block until the write rates of all collection groups of `writes` allow them to be committed."""
+        wait = 0.0
+        with self._lock:
+            now = time.monotonic()
+            for collection_group, n_writes in Counter(get_write_collection_group(write) for write in writes).items():
+                state = self._rates.get(collection_group)
+                if state is None:
+                    state = self._rates[collection_group] = _CollectionRate(self.initial_rate)
+                # refill the bucket (holding up to a second of writes), then reserve the writes, borrowing if needed
+                state.tokens = min(state.rate, state.tokens + (now - state.updated) * state.rate)
+                state.updated = now
+                state.tokens -= n_writes
+                if state.tokens < 0:
+                    wait = max(wait, -state.tokens / state.rate)
+        if wait > 0:
+            time.sleep(wait)
+
+    def _on_success(self, writes: List[dict]):
+        with self._lock:
+            now = time.monotonic()
+            for collection_group in {get_write_collection_group(write) for write in writes}:
+                state = self._rates[collection_group]
+                state.rate = min(state.rate + self.rate_increase, self._ramp_up_limit(state, now))
+            self.batch_size = min(self.batch_size + self.batch_size_increase, MAX_WRITES_PER_COMMIT)
+
+    def _on_throttle(self, writes: List[dict]):
+        with self._lock:
+            for collection_group in {get_write_collection_group(write) for write in writes}:
+                state = self._rates[collection_group]
+                state.rate = max(state.rate / 2, 1.0)
+                state.tokens = min(state.tokens, 0.0)
+            self.batch_size = max(self.batch_size // 2, 1)
+
+    def commit(self, writes: List[dict]) -> dict:
+        """
+        Apply writes within the write rates of their collection groups, retrying throttled writes.
+
+        Writes are applied independently with batchWrite requests, rather than atomically, so that a failed write
+        does not fail the other writes of the batch. Creating a document that already exists is a no-op, so that
+        retried writes are idempotent.
+
+        Returns:
+            an empty dict, or a dict with the "error" of the first writes that could not be applied
+        """
+        for batch in split_writes_per_document(writes):
+            res = self._commit(batch)
+            if "error" in res:
+                return res
+        return {}
+
+    def _commit(self, writes: List[dict]) -> dict:
+        failed: List[dict] = []
+        throttled: List[dict]
+        created: List[dict]
+        attempt = 0
+        while writes:
+            self.acquire(writes)
+            try:
+                res = batch_write(
+                    self.backend.get_auth(), firestore_api_url=self.backend.firestore_api_url, writes=writes
+                )
+            except TransportError as err:
+                # connection errors are retried as an unavailable backend
+                res = {"error": {"code": 503, "status": "UNAVAILABLE", "message": str(err)}}
+            if "error" in res:
+                if not is_throttled(res):
+                    return res
+                throttled, created = writes, []
+            else:
+                throttled, created = [], []
+                for write, status in zip(writes, res.get("status", [])):
+                    code = status.get("code", OK)
+                    if code in THROTTLING_CODES:
+                        throttled.append(write)
+                    elif code == NOT_FOUND and "updateMask" in write:
+                        # merged documents that do not exist yet are created, with their create only fields
+                        created.append(create_write_of(write))
+                    elif code not in (OK, ALREADY_EXISTS):
+                        failed.append(status)
+                if not throttled:
+                    self._on_success(writes)
+            if throttled:
+                self._on_throttle(throttled)
+                if attempt == self.max_retries:
+                    if "error" in res:
+                        return res
+                    failed.extend(status for status in res["status"] if status.get("code") in THROTTLING_CODES)
+                    throttled = []
+                else:
+                    delay = min(self.backoff * 2**attempt, 32.0) * random.uniform(0.5, 1.5)
+                    logger.warning(f"Trubrics writes throttled, retrying {len(throttled)} writes in {delay:.1f}s.")
+                    time.sleep(delay)
+                    attempt += 1
+            writes = throttled + created
+        return self._error(failed)
+
+    @staticmethod
+    def _error(failed: List[dict]) -> dict:
+        if not failed:
+            return {}
+        return {"error": f"{len(failed)} writes could not be saved to Trubrics: {failed[0].get('message')}"}
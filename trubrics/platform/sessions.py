@@ -0,0 +1,152 @@
+import threading
+from datetime import datetime
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from trubrics.platform.backends.base import DocumentWrite
+from trubrics.platform.firestore import generate_document_id
+from trubrics.platform.prompts import ModelConfig
+
+if TYPE_CHECKING:
+    from trubrics.platform import Trubrics
+
+
+class SessionConfig(BaseModel):
+    """
+    The SessionConfig object holds all data shared by the turns of a session, saved once per session.
+
+    Attributes:
+        session_id: a session id, for example for a chatbot conversation
+        config_model: model configuration. See ModelConfig data model.
+        created_on: the UTC created time of the session
+        user_id: a user id
+        tags: session tags
+        metadata: session metadata
+    """
+
+    session_id: str
+    config_model: ModelConfig
+    created_on: datetime = Field(default_factory=datetime.utcnow)
+    user_id: Optional[str] = None
+    tags: list = []
+    metadata: dict = {}
+
+
+class Turn(BaseModel):
+    """
+    The Turn object represents a single prompt / generation exchange within a session.
+
+    Attributes:
+        id: turn id
+        turn: index of the turn within the session
+        prompt: a user prompt
+        generation: a model generation
+        created_on: the UTC created time of the turn
+        metadata: turn metadata, only the data that is new for this turn
+    """
+
+    id: Optional[str] = None
+    turn: int
+    prompt: str
+    generation: str
+    created_on: datetime = Field(default_factory=datetime.utcnow)
+    metadata: dict = {}
+
+
+class Session:
+    def __init__(self, client: "Trubrics", config: SessionConfig, project: str, batch_size: int = 10):
+        """
+        Log the turns of a session as append-only documents under a single session document.
+
+        Turn indices are counted by this session object: a session that is opened again (for example by another
+        process) counts its turns from 0 again, so order the turns of such sessions by `created_on`.
+
+        Args:
+            client: an authenticated Trubrics client
+            config: the session config, saved once to the session document
+            project: the Trubrics project to save the session to
+            batch_size: the number of turns to buffer before writing them to Trubrics
+        """
+        self.client = client
+        self.config = config
+        self.project = project
+        self.batch_size = batch_size
+        self.n_turns = 0
+        self._config_saved = False
+        self._reset()
+
+    def _reset(self):
+        """Drop all buffered turns, and the lock, for example in a forked child process."""
+        self._pending: List[Turn] = []
+        self._lock = threading.Lock()
+
+    @property
+    def collection(self) -> str:
+        return f"sessions/{self.config.session_id}/turns"
+
+    def log_turn(self, prompt: str, generation: str, metadata: dict = {}) -> Turn:
+        """
+        Log a session turn. Turns are buffered and written to Trubrics in batches of `batch_size`.
+
+        Parameters:
+            prompt: user prompt to the model
+            generation: model generation
+            metadata: any metadata specific to this turn
+        """
+        with self._lock:
+            turn = Turn(
+                id=generate_document_id(), turn=self.n_turns, prompt=prompt, generation=generation, metadata=metadata
+            )
+            self.n_turns += 1
+            self._pending.append(turn)
+            n_pending = len(self._pending)
+        # sessions are tracked by the client until flushed, so that buffered turns are written by `Trubrics.flush()`
+        self.client._sessions.setdefault((self.project, self.config.session_id), self)
+        if n_pending >= self.batch_size:
+            self.flush()
+        return turn
+
+    def _take_writes(self) -> Tuple[List[Turn], List[DocumentWrite]]:
+        """
+        Take all buffered turns, with their writes and the write of the session config on first write. Turns logged
+        whilst the writes are committed are buffered for the next commit.
+        """
+        with self._lock:
+            turns, self._pending = self._pending, []
+        writes = []
+        if not self._config_saved:
+            # the session document is only created, so that reopened sessions keep their original config & created_on
+            writes.append(DocumentWrite(self.project, "sessions", self.config.session_id, self.config.dict()))
+        for turn in turns:
+            turn_dict = turn.dict()
+            turn_id = turn_dict.pop("id")
+            writes.append(DocumentWrite(self.project, self.collection, turn_id, turn_dict))
+        return turns, writes
+
+    def _on_commit(self, turns: List[Turn], res: dict) -> bool:
+        if "error" in res:
+            logger.error(res["error"])
+            # keep the turns for the next commit, before any turn logged since
+            with self._lock:
+                self._pending = turns + self._pending
+            return False
+        logger.info(f"{len(turns)} session turns saved to Trubrics.")
+        self._config_saved = True
+        return True
+
+    def flush(self) -> bool:
+        """Write all buffered turns (and the session config, on first write) in a single commit."""
+        turns, writes = self._take_writes()
+        if not turns and self._config_saved:
+            return True
+        return self._on_commit(turns, self.client.backend.commit(writes))
+
+    def __enter__(self) -> "Session":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+        if not self._pending:
+            self.client._sessions.pop((self.project, self.config.session_id), None)
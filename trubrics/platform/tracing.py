@@ -0,0 +1,74 @@
+import time
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Optional, TypeVar
+
+from loguru import logger
+
+from trubrics.platform.prompts import Prompt
+
+if TYPE_CHECKING:
+    from trubrics.platform import Trubrics
+
+T = TypeVar("T")
+
+
+class GenerationTrace:
+    def __init__(self, client: "Trubrics", prompt: Prompt, project: str):
+        """
+        Time a streamed model generation, and log it to Trubrics as a prompt once the stream has ended.
+
+        Args:
+            client: an authenticated Trubrics client
+            prompt: the prompt to log, with an empty generation
+            project: the Trubrics project to log to
+        """
+        self.client = client
+        self.prompt = prompt
+        self.project = project
+        self.generation: Optional[str] = None
+        self._chunks: List[str] = []
+        self._start: Optional[float] = None
+        self._first_chunk: Optional[float] = None
+        self._end: Optional[float] = None
+
+    @property
+    def prompt_id(self) -> str:
+        """The prompt id, available before the prompt is saved, for example to log feedback on the generation."""
+        return self.prompt.id  # type: ignore
+
+    def stream(self, chunks: Iterable[T], text: Optional[Callable[[T], Optional[str]]] = None) -> Iterator[T]:
+        """
+        Wrap a stream of generated chunks, yielding each chunk unchanged.
+
+        Args:
+            chunks: an iterable of generated chunks, such as tokens or a streamed LLM response
+            text: an optional function to get the text of a chunk, if chunks are not strings. For example, with an
+                OpenAI stream: `lambda part: part.choices[0].delta.content`
+        """
+        if self._start is None:
+            self._start = time.perf_counter()
+        for chunk in chunks:
+            if self._first_chunk is None:
+                self._first_chunk = time.perf_counter()
+            self._chunks.append(chunk if text is None else (text(chunk) or ""))  # type: ignore
+            yield chunk
+        # stamped as the stream is exhausted, as the context manager may exit long after the generation has ended
+        self._end = time.perf_counter()
+
+    def __enter__(self) -> "GenerationTrace":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            logger.warning(f"Generation not saved to Trubrics, the stream raised {exc_type.__name__}.")
+            return
+        latency = (self._end or time.perf_counter()) - self._start  # type: ignore
+        self.prompt.generation = self.generation if self.generation is not None else "".join(self._chunks)
+        self.prompt.metadata = {
+            **self.prompt.metadata,
+            "time_to_first_token": None if self._first_chunk is None else self._first_chunk - self._start,
+            "latency": latency,
+            "n_chunks": len(self._chunks),
+            "chunks_per_second": len(self._chunks) / latency if latency > 0 else None,
+        }
+        self.client._submit(self.project, collection="prompts", document=self.prompt)
@@ -0,0 +1,167 @@
+"""
+HTTP transports used by all network calls of the SDK.
+"""
+import json
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, List, Optional, Tuple, Union
+
+import requests  # type: ignore
+
+from trubrics.platform.forking import register_at_fork
+
+
+class TransportError(Exception):
+    pass
+
+
+class TransportResponse:
+    def __init__(self, status_code: int, text: str, url: str = ""):
+        self.status_code = status_code
+        self.text = text
+        self.url = url
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise TransportError(f"{self.status_code} Error for url: {self.url}: {self.text}")
+
+
+class Transport(ABC):
+    """Base class of HTTP transports. Subclasses implement `request`."""
+
+    @abstractmethod
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[dict] = None,
+        data: Union[str, dict, None] = None,
+        timeout: Optional[float] = None,
+    ) -> TransportResponse:
+        """
+        Send an HTTP request.
+
+        Args:
+            method: the HTTP method
+            url: the request url
+            headers: request headers
+            data: a request body, either a string or a dict to be form encoded
+            timeout: a timeout in seconds
+
+        Raises:
+            TransportError: if the request could not be sent
+        """
+        ...
+
+    def get(self, url: str, **kwargs) -> TransportResponse:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> TransportResponse:
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> TransportResponse:
+        return self.request("PATCH", url, **kwargs)
+
+    def close(self):
+        """Close all open connections."""
+        pass
+
+    def _before_fork(self):
+        pass
+
+    def _after_fork_in_child(self):
+        """Drop connections inherited from the parent process, without closing them, as they are still in use there."""
+        pass
+
+
+class RequestsTransport(Transport):
+    def __init__(self):
+        """An HTTP/1.1 transport with a pool of keep-alive connections, using `requests`."""
+        self._session = requests.Session()
+
+    def request(self, method, url, headers=None, data=None, timeout=None) -> TransportResponse:
+        try:
+            r = self._session.request(method, url, headers=headers, data=data, timeout=timeout)
+        except requests.exceptions.RequestException as err:
+            raise TransportError(str(err)) from err
+        return TransportResponse(r.status_code, r.text, url)
+
+    def close(self):
+        self._session.close()
+
+    def _after_fork_in_child(self):
+        self._session = requests.Session()
+
+
+class HTTP2Transport(Transport):
+    def __init__(self):
+        """
+        An HTTP/2 transport using `httpx`, multiplexing concurrent requests (for example from several threads) over a
+        single connection per host. Install with `pip install "trubrics[http2]"`.
+        """
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError('The HTTP/2 transport requires httpx. Install it with `pip install "trubrics[http2]"`.')
+
+        self._httpx = httpx
+        self._client = httpx.Client(http2=True)
+
+    def request(self, method, url, headers=None, data=None, timeout=None) -> TransportResponse:
+        body = {"data": data} if isinstance(data, dict) else {"content": data}
+        try:
+            r = self._client.request(method, url, headers=headers, timeout=timeout, **body)
+        except self._httpx.HTTPError as err:
+            raise TransportError(str(err)) from err
+        return TransportResponse(r.status_code, r.text, url)
+
+    def close(self):
+        self._client.close()
+
+    def _after_fork_in_child(self):
+        self._client = self._httpx.Client(http2=True)
+
+
+class InMemoryTransport(Transport):
+    def __init__(self, handler: Optional[Callable[[str, str, Union[str, dict, None]], Tuple[int, object]]] = None):
+        """
+        A transport that sends no requests, for tests & offline benchmarks. All requests are recorded in `requests`.
+
+        Args:
+            handler: a function of (method, url, data) returning a (status_code, body) tuple. The body is json encoded
+                if it is not a string. Defaults to returning (200, {}).
+        """
+        self.handler = handler or (lambda method, url, data: (200, {}))
+        self.requests: List[dict] = []
+        self._lock = threading.Lock()
+
+    def _after_fork_in_child(self):
+        self._lock = threading.Lock()
+
+    def request(self, method, url, headers=None, data=None, timeout=None) -> TransportResponse:
+        with self._lock:
+            self.requests.append({"method": method, "url": url, "headers": headers, "data": data})
+        status_code, body = self.handler(method, url, data)
+        return TransportResponse(status_code, body if isinstance(body, str) else json.dumps(body), url)
+
+
+_transport: Optional[Transport] = None
+
+
+def get_transport() -> Transport:
+    """Get the transport used by the SDK, a `RequestsTransport` by default."""
+    if _transport is None:
+        set_transport(RequestsTransport())
+    return _transport  # type: ignore
+
+
+def set_transport(transport: Transport):
+    """Set the transport used by all network calls of the SDK, for example an `HTTP2Transport`."""
+    global _transport
+    if _transport is not None and _transport is not transport:
+        _transport.close()
+    _transport = transport
+    register_at_fork(transport)
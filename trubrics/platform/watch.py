@@ -0,0 +1,150 @@
+"""
+Incremental polling of new feedback, reading only the documents created since the last poll.
+"""
+import json
+import os
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterator, List, Optional
+
+from loguru import logger
+
+from trubrics.platform.firestore import (
+    build_structured_query,
+    firestore_document_to_dict,
+    run_query,
+)
+from trubrics.platform.transport import TransportError
+
+if TYPE_CHECKING:
+    from trubrics.platform.backends import FirestoreBackend
+
+
+class FeedbackWatcher:
+    def __init__(
+        self,
+        backend: "FirestoreBackend",
+        project: str,
+        component: str,
+        filters: List[dict] = [],
+        fields: Optional[List[str]] = None,
+        since: Optional[datetime] = None,
+        cursor_path: Optional[str] = None,
+        page_size: int = 100,
+        min_interval: float = 1.0,
+        max_interval: float = 60.0,
+    ):
+        """
+        Poll the feedback responses of a component for new feedback, ordered by `created_on`.
+
+        Each poll queries the feedback created after the last seen feedback, with a field mask so that only the
+        selected fields are read. The polling interval is doubled after each poll without new feedback (up to
+        `max_interval`), and halved after each poll with new feedback (down to `min_interval`). Full pages of new
+        feedback are followed by an immediate poll.
+
+        Args:
+            backend: the hosted Trubrics backend of a client, e.g. `trubrics.backend`
+            project: the project of the component
+            component: feedback component name created in Trubrics
+            filters: structured query filters, e.g. from `Trubrics._feedback_filters`
+            fields: dotted paths of the fields to read, e.g. "user_response.score". All fields are read by default.
+            since: watch feedback created on or after this datetime (in UTC), defaults to now. Ignored if resuming
+                from a saved cursor.
+            cursor_path: an optional path to a file that saves the cursor of the last seen feedback, to resume from
+            page_size: the maximum number of feedback responses read per poll
+            min_interval: the minimum number of seconds between polls
+            max_interval: the maximum number of seconds between polls
+        """
+        self.backend = backend
+        self.project = project
+        self.component = component
+        self.filters = filters
+        self.fields = fields
+        self.cursor_path = cursor_path
+        self.page_size = page_size
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.cursor = self._load_cursor() or {
+            "created_on": (since or datetime.utcnow()).isoformat() + "Z",
+            "name": None,
+        }
+
+    def _load_cursor(self) -> Optional[dict]:
+        if self.cursor_path is None or not os.path.exists(self.cursor_path):
+            return None
+        with open(self.cursor_path) as f:
+            return json.load(f)
+
+    def _save_cursor(self):
+        if self.cursor_path is None:
+            return
+        tmp_path = f"{self.cursor_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.cursor, f)
+        os.replace(tmp_path, self.cursor_path)
+
+    def _structured_query(self) -> dict:
+        created_on_filter = {
+            "fieldFilter": {
+                "field": {"fieldPath": "created_on"},
+                "op": "GREATER_THAN_OR_EQUAL",
+                "value": {"timestampValue": self.cursor["created_on"]},
+            }
+        }
+        kwargs: dict = {
+            "orderBy": [
+                {"field": {"fieldPath": "created_on"}, "direction": "ASCENDING"},
+                {"field": {"fieldPath": "__name__"}, "direction": "ASCENDING"},
+            ],
+            "limit": self.page_size,
+        }
+        if self.cursor["name"] is not None:
+            # start after the last seen feedback, as several feedback responses may share a created_on
+            kwargs["startAt"] = {
+                "values": [{"timestampValue": self.cursor["created_on"]}, {"referenceValue": self.cursor["name"]}],
+                "before": False,
+            }
+        if self.fields is not None:
+            kwargs["select"] = {"fields": [{"fieldPath": field} for field in {*self.fields, "created_on"}]}
+        return build_structured_query("responses", filters=[*self.filters, created_on_filter], **kwargs)
+
+    def poll(self) -> List[dict]:
+        """Read a page of the feedback created since the last poll, moving the cursor to the last read feedback."""
+        try:
+            res = run_query(
+                self.backend.get_auth(),
+                parent_url=self.backend.firestore_api_url + f"/projects/{self.project}/feedback/{self.component}",
+                structured_query=self._structured_query(),
+            )
+        except TransportError as err:
+            logger.error(f"Error polling Trubrics feedback: {str(err)}.")
+            return []
+        if isinstance(res, dict):
+            res = [res]
+        errors = [row["error"] for row in res if "error" in row]
+        if errors:
+            logger.error(errors[0])
+            return []
+        documents = [row["document"] for row in res if "document" in row]
+        if documents:
+            self.cursor = {
+                "created_on": documents[-1]["fields"]["created_on"]["timestampValue"],
+                "name": documents[-1]["name"],
+            }
+        return [firestore_document_to_dict(document) for document in documents]
+
+    def __iter__(self) -> Iterator[dict]:
+        while True:
+            feedback = self.poll()
+            yield from feedback
+            if feedback:
+                # save the cursor once all feedback of the page has been processed
+                self._save_cursor()
+            if len(feedback) == self.page_size:
+                continue
+            if feedback:
+                self.interval = max(self.interval / 2, self.min_interval)
+            else:
+                self.interval = min(self.interval * 2, self.max_interval)
+            time.sleep(self.interval)
@@ -0,0 +1,77 @@
+"""
+Background writer, saving documents to Trubrics off the hot path of an app.
+"""
+import atexit
+import queue
+import threading
+from typing import TYPE_CHECKING, List, Optional
+
+from loguru import logger
+
+from trubrics.platform.backends.base import DocumentWrite
+from trubrics.platform.firestore import MAX_WRITES_PER_COMMIT
+
+if TYPE_CHECKING:
+    from trubrics.platform import Trubrics
+
+
+class BackgroundWriter:
+    def __init__(self, client: "Trubrics", batch_size: int = MAX_WRITES_PER_COMMIT):
+        """
+        Commit document writes from a background thread. All writes queued whilst a commit is in flight are grouped
+        into the next commit, up to `batch_size` writes per commit (and up to the batch size of the storage backend of
+        the client, that the hosted backend ramps up gradually and backs off when throttled).
+
+        The thread is started on the first submitted write, and all queued writes are flushed at exit.
+
+        Args:
+            client: an authenticated Trubrics client
+            batch_size: the maximum number of writes per commit
+        """
+        self.client = client
+        self.batch_size = batch_size
+        self._reset()
+        atexit.register(self.flush)
+
+    def _reset(self):
+        """Drop all queued writes, and the thread & lock, for example in a forked child process."""
+        self._queue: "queue.Queue[DocumentWrite]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, write: DocumentWrite):
+        """Queue a document write."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trubrics-writer", daemon=True)
+                self._thread.start()
+        self._queue.put(write)
+
+    def flush(self):
+        """Block until all queued writes have been committed."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _run(self):
+        while True:
+            writes = [self._queue.get()]
+            try:
+                batch_size = min(self.batch_size, self.client.backend.batch_size)
+                while len(writes) < batch_size:
+                    try:
+                        writes.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                self._commit(writes)
+            except Exception as err:
+                logger.error(f"Error saving {len(writes)} documents to Trubrics: {str(err)}.")
+            finally:
+                for _ in writes:
+                    self._queue.task_done()
+
+    def _commit(self, writes: List[DocumentWrite]):
+        res = self.client.backend.commit(writes)
+        if "error" in res:
+            logger.error(res["error"])
+        else:
+            logger.info(f"{len(writes)} documents saved to Trubrics.")